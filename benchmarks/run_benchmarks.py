@@ -0,0 +1,198 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Add the parent directory to the PYTHONPATH
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pandas as pd
+from benchmarks.synthetic import generate_data, write_csv_files
+from src.data_handler import DataHandler
+from src.function_selector import FunctionSelector
+from src.mapping_service import MappingModel
+from src.test_mapper import TestMapper
+from src.visualizer import Visualizer
+
+STAGES = ('load_data', 'save_to_db', 'calculate_deviations', 'select_ideal_functions',
+          'map_test_data', 'map_point', 'visualize')
+# Single-point calls per run of the map_point stage, which measures the service latency
+POINT_CALLS = 1000
+
+class BenchmarkSuite:
+    """
+    BenchmarkSuite class for timing each pipeline stage on synthetic data.
+
+    Every stage is timed separately as the best wall time of several repeats, and its
+    peak traced memory is measured in one extra run under tracemalloc, so the tracing
+    overhead does not distort the timings.
+
+    Attributes:
+        rows (int): Number of points on the x grid.
+        ideal_columns (int): Number of ideal functions.
+        test_points (int): Number of test points.
+        repeat (int): Number of timed runs per stage.
+        seed (int): Seed of the synthetic data generator.
+    """
+    def __init__(self, rows=400, ideal_columns=50, test_points=100, repeat=3, seed=0):
+        if repeat < 1:
+            raise ValueError("repeat must be at least 1")
+        self.rows = rows
+        self.ideal_columns = ideal_columns
+        self.test_points = test_points
+        self.repeat = repeat
+        self.seed = seed
+
+    def run(self, stages=STAGES):
+        """
+        Run the benchmarks.
+
+        Args:
+            stages (tuple): Names of the stages to run, a subset of STAGES.
+
+        Returns:
+            dict: The configuration, environment and per-stage results.
+        """
+        unknown = set(stages) - set(STAGES)
+        if unknown:
+            raise ValueError(f"Unknown stages {sorted(unknown)}, expected a subset of {STAGES}")
+        train_df, ideal_df, test_df = generate_data(self.rows, self.ideal_columns, test_points=self.test_points,
+                                                    seed=self.seed)
+        results = {}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            paths = write_csv_files(tmp_dir, train_df, ideal_df, test_df)
+            handler = DataHandler(*paths, 'sqlite:///' + os.path.join(tmp_dir, 'bench.db'))
+            handler.load_data()
+
+            selector = FunctionSelector(train_df, ideal_df)
+            with contextlib.redirect_stdout(io.StringIO()):
+                selector.calculate_deviations()
+                best_ideal_functions = selector.select_ideal_functions()
+            mapper = TestMapper(test_df, ideal_df, train_df, best_ideal_functions)
+            test_results_df = mapper.map_test_data()
+            model = MappingModel(handler, source='csv')
+            with contextlib.redirect_stdout(io.StringIO()):
+                model.load()
+            point = test_df.iloc[0]
+
+            def map_points():
+                for _ in range(POINT_CALLS):
+                    model.map_points([point['x']], [point['y']])
+
+            def select():
+                selector.deviation_df = selector.deviation_df.sample(frac=1, random_state=self.seed)
+                selector.select_ideal_functions()
+
+            actions = {
+                'load_data': handler.load_data,
+                'save_to_db': handler.save_to_db,
+                'calculate_deviations': selector.calculate_deviations,
+                'select_ideal_functions': select,
+                'map_test_data': mapper.map_test_data,
+                'map_point': map_points,
+                'visualize': Visualizer(train_df, ideal_df, test_results_df).build_plots
+            }
+            for stage in stages:
+                results[stage] = self._measure(actions[stage])
+            if 'map_point' in results:
+                results['map_point']['seconds_per_call'] = results['map_point']['seconds'] / POINT_CALLS
+            handler.engine.dispose()
+
+        return {
+            'config': {
+                'rows': self.rows,
+                'ideal_columns': self.ideal_columns,
+                'test_points': self.test_points,
+                'repeat': self.repeat,
+                'seed': self.seed
+            },
+            'environment': {
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'pandas': pd.__version__,
+                'machine': platform.machine()
+            },
+            'results': results
+        }
+
+    def _measure(self, action):
+        timings = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(self.repeat):
+                start = time.perf_counter()
+                action()
+                timings.append(time.perf_counter() - start)
+
+            tracemalloc.start()
+            try:
+                action()
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+        return {'seconds': min(timings), 'mean_seconds': sum(timings) / len(timings), 'peak_memory_bytes': peak}
+
+def compare_to_baseline(report, baseline, tolerance=0.25):
+    """
+    Compare benchmark results against a stored baseline report.
+
+    A stage regresses when its time or peak memory exceeds the baseline by more than
+    the tolerance. Stages missing from either report are skipped.
+
+    Args:
+        report (dict): Report returned by BenchmarkSuite.run.
+        baseline (dict): Earlier report to compare against.
+        tolerance (float): Allowed relative increase, e.g. 0.25 for 25 %.
+
+    Returns:
+        dict: Per-stage time and memory ratios, and the list of regressed stages.
+    """
+    comparison = {'stages': {}, 'regressions': []}
+    for stage, result in report['results'].items():
+        reference = baseline.get('results', {}).get(stage)
+        if reference is None:
+            continue
+        time_ratio = result['seconds'] / reference['seconds'] if reference['seconds'] > 0 else float('inf')
+        memory_ratio = (result['peak_memory_bytes'] / reference['peak_memory_bytes']
+                        if reference['peak_memory_bytes'] > 0 else 1.0)
+        regressed = time_ratio > 1 + tolerance or memory_ratio > 1 + tolerance
+        comparison['stages'][stage] = {'time_ratio': time_ratio, 'memory_ratio': memory_ratio, 'regressed': regressed}
+        if regressed:
+            comparison['regressions'].append(stage)
+    return comparison
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the selection, mapping, persistence and plotting stages.")
+    parser.add_argument('--rows', type=int, default=400, help="Points on the x grid (default: 400)")
+    parser.add_argument('--ideal-columns', type=int, default=50, help="Number of ideal functions (default: 50)")
+    parser.add_argument('--test-points', type=int, default=100, help="Number of test points (default: 100)")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per stage (default: 3)")
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES, help="Stages to run (default: all)")
+    parser.add_argument('--output', help="Write the JSON report to this file instead of stdout")
+    parser.add_argument('--baseline', help="JSON report to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Allowed relative slowdown or memory growth against the baseline (default: 0.25)")
+    args = parser.parse_args()
+
+    suite = BenchmarkSuite(args.rows, args.ideal_columns, args.test_points, args.repeat)
+    report = suite.run(tuple(args.stages))
+    if args.baseline:
+        with open(args.baseline) as f:
+            report['comparison'] = compare_to_baseline(report, json.load(f), args.tolerance)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if report.get('comparison', {}).get('regressions'):
+        print(f"Regressions against the baseline: {', '.join(report['comparison']['regressions'])}", file=sys.stderr)
+        sys.exit(1)
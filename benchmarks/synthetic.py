@@ -0,0 +1,65 @@
+import os
+import numpy as np
+import pandas as pd
+
+def generate_data(rows=400, ideal_columns=50, train_columns=4, test_points=100, noise=0.05, seed=0):
+    """
+    Generate synthetic train, ideal and test data shaped like the project's CSV files.
+
+    The ideal functions are random sine, cosine and polynomial curves on a shared x
+    grid. Each training function is one of them plus Gaussian noise, and the test
+    points lie near randomly chosen training functions, with a share of outliers.
+
+    Args:
+        rows (int): Number of points on the x grid.
+        ideal_columns (int): Number of ideal functions.
+        train_columns (int): Number of training functions.
+        test_points (int): Number of test points.
+        noise (float): Standard deviation of the noise added to the training functions.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        tuple: (train_df, ideal_df, test_df).
+    """
+    if train_columns > ideal_columns:
+        raise ValueError("train_columns must not exceed ideal_columns")
+    rng = np.random.default_rng(seed)
+    x = np.linspace(-20, 20, rows)
+
+    kind = rng.integers(0, 3, size=ideal_columns)
+    amplitude = rng.uniform(0.5, 5, size=ideal_columns)
+    frequency = rng.uniform(0.1, 2, size=ideal_columns)
+    offset = rng.uniform(-10, 10, size=ideal_columns)
+    ideal = np.where(
+        kind == 0, amplitude * np.sin(np.outer(x, frequency)),
+        np.where(kind == 1, amplitude * np.cos(np.outer(x, frequency)),
+                 np.outer(x, amplitude / 10) ** 2 * np.sign(frequency - 1))
+    ) + offset
+    ideal_df = pd.DataFrame(ideal, columns=[f'y{i}' for i in range(1, ideal_columns + 1)])
+    ideal_df.insert(0, 'x', x)
+
+    chosen = rng.choice(ideal_columns, size=train_columns, replace=False)
+    train = ideal[:, chosen] + rng.normal(0, noise, size=(rows, train_columns))
+    train_df = pd.DataFrame(train, columns=[f'y{i}' for i in range(1, train_columns + 1)])
+    train_df.insert(0, 'x', x)
+
+    grid_positions = rng.integers(0, rows, size=test_points)
+    source = chosen[rng.integers(0, train_columns, size=test_points)]
+    y = ideal[grid_positions, source] + rng.normal(0, noise, size=test_points)
+    outliers = rng.random(test_points) < 0.2
+    y[outliers] += rng.uniform(-50, 50, size=outliers.sum())
+    test_df = pd.DataFrame({'x': x[grid_positions], 'y': y})
+
+    return train_df, ideal_df, test_df
+
+def write_csv_files(directory, train_df, ideal_df, test_df):
+    """
+    Write generated data to train.csv, ideal.csv and test.csv in a directory.
+
+    Returns:
+        tuple: Paths of the train, ideal and test files.
+    """
+    paths = tuple(os.path.join(directory, f'{name}.csv') for name in ('train', 'ideal', 'test'))
+    for path, df in zip(paths, (train_df, ideal_df, test_df)):
+        df.to_csv(path, index=False)
+    return paths
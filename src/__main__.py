@@ -0,0 +1,4 @@
+import sys
+from src.cli import main
+
+sys.exit(main())
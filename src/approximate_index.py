@@ -0,0 +1,243 @@
+import hashlib
+import os
+import numpy as np
+import pandas as pd
+from src.data_handler import content_fingerprint, update_fingerprint
+from src.deviation_engine import DeviationEngine
+
+def index_path_for(db_path):
+    """
+    Get the default index file path beside an SQLite database.
+
+    Args:
+        db_path (str): SQLAlchemy URL of the database, e.g. 'sqlite:///data.db'.
+
+    Returns:
+        str: Path of the index file, e.g. 'data.ann.npz'.
+    """
+    database = db_path.split('///', 1)[-1]
+    return os.path.splitext(database)[0] + '.ann.npz'
+
+def _ideal_blocks(ideal_loader, block_size=1000):
+    if isinstance(ideal_loader, pd.DataFrame):
+        return [ideal_loader]
+    return ideal_loader.iter_ideal_blocks(block_size, source='db')
+
+def ideal_fingerprint(ideal_loader):
+    """
+    Get the content hash of the current ideal functions, to compare with an index's fingerprint.
+
+    Args:
+        ideal_loader (DataFrame or DataHandler): The ideal functions, which are hashed in
+            memory, or a DataHandler whose hash recorded by save_to_db is read without
+            scanning the ideal table.
+
+    Returns:
+        str: Hex digest, see content_fingerprint.
+    """
+    if isinstance(ideal_loader, pd.DataFrame):
+        return content_fingerprint(ideal_loader)
+    return ideal_loader.table_fingerprint('ideal')
+
+class ApproximateIdealIndex:
+    """
+    ApproximateIdealIndex class for finding the best ideal functions without an exact scan.
+
+    Every ideal function is embedded into a low dimension with a Gaussian random
+    projection, which approximately preserves the Euclidean distances, and so the sums
+    of squared deviations, between functions. A query ranks all ideal functions by their
+    distance in the embedding and re-ranks only a shortlist exactly against the real
+    values.
+
+    Attributes:
+        dimensions (int): Size of the embedding.
+        seed (int): Seed of the random projection.
+        columns (ndarray): Names of the indexed ideal functions.
+        embedded (ndarray): Embedded ideal functions of shape (functions, dimensions).
+        n_rows (int): Number of rows the projection was built for.
+        fingerprint (str): Content hash of the ideal functions the index was built from,
+            see ideal_fingerprint.
+    """
+    def __init__(self, dimensions=32, seed=0):
+        if dimensions < 1:
+            raise ValueError("dimensions must be at least 1")
+        self.dimensions = dimensions
+        self.seed = seed
+        self.columns = None
+        self.embedded = None
+        self.n_rows = None
+        self.fingerprint = None
+
+    def _projection(self):
+        rng = np.random.default_rng(self.seed)
+        return rng.normal(size=(self.n_rows, self.dimensions)) / np.sqrt(self.dimensions)
+
+    def build(self, ideal_blocks):
+        """
+        Build the index from the ideal functions, one block of columns at a time.
+
+        Args:
+            ideal_blocks (iterable): DataFrames holding 'x' and a block of ideal functions,
+                e.g. from DataHandler.iter_ideal_blocks(source='db'), or a single DataFrame.
+
+        Returns:
+            ApproximateIdealIndex: The index itself.
+        """
+        if isinstance(ideal_blocks, pd.DataFrame):
+            ideal_blocks = [ideal_blocks]
+        columns, embedded = [], []
+        projection = None
+        digest = hashlib.sha256()
+        for block in ideal_blocks:
+            update_fingerprint(digest, block, projection is None)
+            block_columns = block.columns.drop('x')
+            if projection is None:
+                self.n_rows = len(block)
+                projection = self._projection()
+            elif len(block) != self.n_rows:
+                raise ValueError("All ideal blocks must have the same number of rows")
+            embedded.append(block[block_columns].to_numpy(dtype=np.float64).T @ projection)
+            columns.extend(block_columns)
+
+        self.columns = np.array(columns, dtype=str)
+        self.embedded = np.vstack(embedded) if embedded else np.empty((0, self.dimensions))
+        self._embedded_sq_norms = np.einsum('ij,ij->i', self.embedded, self.embedded)
+        self.fingerprint = digest.hexdigest()
+        return self
+
+    def save(self, path):
+        """
+        Persist the index with the fingerprint of its ideal data, e.g. beside data.db at
+        index_path_for(db_path).
+        """
+        with open(path, 'wb') as f:
+            np.savez(f, columns=self.columns, embedded=self.embedded,
+                     settings=np.array([self.dimensions, self.seed, self.n_rows]),
+                     fingerprint=np.array(self.fingerprint or ''))
+
+    @classmethod
+    def load(cls, path, ideal_loader=None):
+        """
+        Load an index written by save.
+
+        Args:
+            path (str): Path of the index file.
+            ideal_loader (DataFrame or DataHandler): The current ideal functions. When given,
+                the index is only returned if it was built from exactly this data, see
+                ideal_fingerprint.
+
+        Returns:
+            ApproximateIdealIndex: The loaded index.
+        """
+        with np.load(path, allow_pickle=False) as data:
+            dimensions, seed, n_rows = (int(value) for value in data['settings'])
+            index = cls(dimensions, seed)
+            index.n_rows = n_rows
+            index.columns = data['columns']
+            index.embedded = data['embedded']
+            index.fingerprint = str(data['fingerprint']) if 'fingerprint' in data.files else None
+        if ideal_loader is not None and index.fingerprint != ideal_fingerprint(ideal_loader):
+            raise ValueError(f"The index at {path} was built from different ideal data, rebuild it")
+        index._embedded_sq_norms = np.einsum('ij,ij->i', index.embedded, index.embedded)
+        return index
+
+    @classmethod
+    def load_or_build(cls, path, ideal_loader, dimensions=32, seed=0, block_size=1000):
+        """
+        Load the index at path if it matches the ideal data, otherwise build and save a new one.
+
+        Args:
+            path (str): Path of the index file, e.g. index_path_for(db_path).
+            ideal_loader (DataFrame or DataHandler): The current ideal functions.
+            dimensions (int): Size of the embedding of a rebuilt index.
+            seed (int): Seed of the random projection of a rebuilt index.
+            block_size (int): Number of columns read at a time from the database.
+
+        Returns:
+            ApproximateIdealIndex: An index built from the current ideal data.
+        """
+        try:
+            return cls.load(path, ideal_loader)
+        except (FileNotFoundError, ValueError) as e:
+            print(f"Rebuilding the approximate index: {e}")
+        index = cls(dimensions, seed).build(_ideal_blocks(ideal_loader, block_size))
+        index.save(path)
+        return index
+
+    def shortlist(self, train_df, size=50):
+        """
+        Get the ideal functions closest to each training function in the embedding.
+
+        Args:
+            train_df (DataFrame): Training data with an 'x' column.
+            size (int): Number of candidates per training function.
+
+        Returns:
+            dict: Training function mapped to the names of its candidates.
+        """
+        if self.embedded is None:
+            raise RuntimeError("The index has not been built")
+        train_columns = train_df.columns.drop('x')
+        train_matrix = train_df.loc[range(self.n_rows), train_columns].to_numpy(dtype=np.float64)
+        queries = train_matrix.T @ self._projection()
+        distances = (np.einsum('ij,ij->i', queries, queries)[:, None] + self._embedded_sq_norms[None, :]
+                     - 2.0 * queries @ self.embedded.T)
+        size = min(size, len(self.columns))
+        if size < 1:
+            raise ValueError("The shortlist needs at least one candidate")
+        candidates = np.argpartition(distances, size - 1, axis=1)[:, :size]
+        return {train_col: list(self.columns[np.sort(row)]) for train_col, row in zip(train_columns, candidates)}
+
+    def best_ideal_functions(self, train_df, ideal_loader, shortlist_size=50):
+        """
+        Select the best ideal function per training function by exact re-ranking of a shortlist.
+
+        Larger shortlists raise the recall, i.e. the chance that the exact best function
+        is among the candidates, at the cost of reading and scoring more columns.
+
+        Args:
+            train_df (DataFrame): Training data with an 'x' column.
+            ideal_loader (DataFrame or DataHandler): The ideal functions, or a DataHandler
+                whose read_table reads only the shortlisted columns from the database.
+            shortlist_size (int): Number of candidates re-ranked exactly per training function.
+
+        Returns:
+            DataFrame: 'Train Function', 'Ideal Function', 'Deviation' and 'Max Deviation',
+                like FunctionSelector.select_ideal_functions.
+        """
+        candidates = self.shortlist(train_df, shortlist_size)
+        wanted = sorted({col for cols in candidates.values() for col in cols})
+        if isinstance(ideal_loader, pd.DataFrame):
+            ideal_df = ideal_loader[['x'] + wanted]
+        else:
+            ideal_df = ideal_loader.read_table('ideal', wanted)
+        rows = range(self.n_rows)
+
+        results = []
+        for train_col, cols in candidates.items():
+            train_matrix = train_df.loc[rows, [train_col]].to_numpy(dtype=np.float64)
+            ideal_matrix = ideal_df.loc[rows, cols].to_numpy(dtype=np.float64)
+            deviations = DeviationEngine(ideal_matrix).sum_squared_deviations(train_matrix)[0]
+            best = int(np.argmin(deviations))
+            max_deviation = np.abs(train_matrix[:, 0] - ideal_matrix[:, best]).max(initial=0.0)
+            results.append((train_col, cols[best], deviations[best], max_deviation))
+        return pd.DataFrame(results, columns=['Train Function', 'Ideal Function', 'Deviation', 'Max Deviation'])
+
+def selection_agreement(approximate, exact):
+    """
+    Compare an approximate selection with the exact one.
+
+    Args:
+        approximate (DataFrame): Result of ApproximateIdealIndex.best_ideal_functions.
+        exact (DataFrame): Result of FunctionSelector.select_ideal_functions.
+
+    Returns:
+        dict: The fraction of training functions with the same ideal function, and the
+            mismatches as (train function, approximate choice, exact choice) tuples.
+    """
+    merged = approximate.merge(exact, on='Train Function', suffixes=(' Approximate', ' Exact'))
+    # The name columns may be categoricals over different sets of functions
+    same = merged['Ideal Function Approximate'].astype(object) == merged['Ideal Function Exact'].astype(object)
+    mismatches = list(merged.loc[~same, ['Train Function', 'Ideal Function Approximate', 'Ideal Function Exact']]
+                      .itertuples(index=False, name=None))
+    return {'agreement': float(same.mean()) if len(merged) else 1.0, 'mismatches': mismatches}
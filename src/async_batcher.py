@@ -0,0 +1,146 @@
+import asyncio
+import time
+from collections import deque
+import numpy as np
+
+class MappingBatcher:
+    """
+    MappingBatcher class for micro-batching concurrent mapping requests with asyncio.
+
+    Requests that arrive within a time window are combined, up to a maximum number of
+    points, and mapped with one call of map_batch in an executor, off the event loop.
+    The results are then split up and returned to each caller.
+
+    Attributes:
+        map_batch (callable): Function taking arrays of x and y values and returning one
+            result per point in input order, e.g. MappingModel.map_points.
+        max_batch_size (int): Number of points after which a batch is closed early.
+        max_wait (float): Seconds a batch stays open for more requests after the first.
+        executor (Executor): Executor running map_batch, None for the loop's default.
+    """
+    def __init__(self, map_batch, max_batch_size=1024, max_wait=0.002, executor=None, metrics_window=10000):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        if max_wait < 0:
+            raise ValueError("max_wait must not be negative")
+        self.map_batch = map_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.executor = executor
+        self._latencies = deque(maxlen=metrics_window)
+        self._batch_sizes = deque(maxlen=metrics_window)
+        self._requests = 0
+        self._batches = 0
+        self._queue = None
+        self._worker = None
+        # Requests taken off the queue whose batch has not been answered yet
+        self._in_flight = []
+
+    async def start(self):
+        """
+        Start the background task that collects and maps the batches.
+        """
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """
+        Stop the background task and cancel the requests of the batch being collected or
+        mapped, and those still waiting in the queue.
+        """
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+            for _, future, _ in self._in_flight:
+                future.cancel()
+            self._in_flight = []
+            while not self._queue.empty():
+                _, future, _ = self._queue.get_nowait()
+                future.cancel()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+
+    async def map_points(self, points):
+        """
+        Map a handful of points as part of the next batch.
+
+        Args:
+            points (array-like): Sequence of (x, y) pairs.
+
+        Returns:
+            list: One result per point, in input order.
+        """
+        await self.start()
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((points, future, time.perf_counter()))
+        return await future
+
+    def metrics(self):
+        """
+        Get latency and batch size statistics over the recent requests.
+
+        Returns:
+            dict: Request and batch counts, p50/p99 latency in seconds and batch sizes in points.
+        """
+        latencies = np.asarray(self._latencies)
+        batch_sizes = np.asarray(self._batch_sizes)
+        return {
+            'requests': self._requests,
+            'batches': self._batches,
+            'latency_p50': float(np.percentile(latencies, 50)) if len(latencies) else None,
+            'latency_p99': float(np.percentile(latencies, 99)) if len(latencies) else None,
+            'batch_size_mean': float(batch_sizes.mean()) if len(batch_sizes) else None,
+            'batch_size_p50': float(np.percentile(batch_sizes, 50)) if len(batch_sizes) else None,
+            'batch_size_max': int(batch_sizes.max()) if len(batch_sizes) else None
+        }
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = self._in_flight = [await self._queue.get()]
+            size = len(pending[0][0])
+            deadline = loop.time() + self.max_wait
+            while size < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    request = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                pending.append(request)
+                size += len(request[0])
+            await self._map_pending(loop, pending)
+            self._in_flight = []
+
+    async def _map_pending(self, loop, pending):
+        points = np.concatenate([request[0] for request in pending])
+        try:
+            results = await loop.run_in_executor(self.executor, self.map_batch, points[:, 0], points[:, 1])
+        except Exception as e:
+            for _, future, _ in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        finished = time.perf_counter()
+        offset = 0
+        for request_points, future, enqueued in pending:
+            if not future.done():
+                future.set_result(list(results[offset:offset + len(request_points)]))
+            offset += len(request_points)
+            self._latencies.append(finished - enqueued)
+        self._requests += len(pending)
+        self._batches += 1
+        self._batch_sizes.append(len(points))
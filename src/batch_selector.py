@@ -0,0 +1,125 @@
+import numpy as np
+from src.data_handler import bulk_load, write_table
+from src.deviation_engine import DeviationEngine
+from src.results import ResultBuffer
+
+class BatchFunctionSelector:
+    """
+    BatchFunctionSelector class for selecting ideal functions for many training sets at once.
+
+    The ideal catalogue is read and preprocessed once: its matrix is centred and its
+    column norms are computed by a single DeviationEngine. Every training set, e.g. one
+    per sensor, is then scored against the whole catalogue with one matrix product, and
+    the selections of all tenants are written to the database in one transaction.
+
+    Attributes:
+        ideal_columns (Index): Names of the ideal functions.
+        ideal_matrix (ndarray): Ideal values of shape (rows, ideal functions).
+        engine (DeviationEngine): Preprocessed catalogue shared by all training sets.
+    """
+    def __init__(self, ideal_df):
+        self.ideal_columns = ideal_df.columns.drop('x')
+        self.ideal_matrix = ideal_df.loc[range(len(ideal_df)), self.ideal_columns].to_numpy(dtype=np.float64)
+        self.engine = DeviationEngine(self.ideal_matrix)
+
+    @classmethod
+    def from_db(cls, data_handler):
+        """
+        Create a selector from the ideal table written by DataHandler.save_to_db.
+
+        Returns:
+            BatchFunctionSelector: Selector for the stored catalogue.
+        """
+        return cls(data_handler.read_table('ideal'))
+
+    def select(self, train_df):
+        """
+        Select the best ideal function per training function of one training set.
+
+        Returns:
+            DataFrame: 'Train Function', 'Ideal Function', 'Deviation', 'Max Deviation' and
+                'Threshold', the maximum deviation scaled by sqrt(2) as TestMapper applies it.
+        """
+        return self.select_many([('', train_df)]).drop(columns='Tenant')
+
+    def select_many(self, tenants):
+        """
+        Select the best ideal functions for every tenant's training set.
+
+        Args:
+            tenants (dict or iterable): Tenant names mapped to training DataFrames, or
+                (tenant, DataFrame) pairs, e.g. from a generator reading one file at a time.
+
+        Returns:
+            DataFrame: The columns of select with a leading 'Tenant' column.
+        """
+        if isinstance(tenants, dict):
+            tenants = tenants.items()
+        names, results = [], None
+        try:
+            for tenant, train_df in tenants:
+                train_columns = train_df.columns.drop('x')
+                if results is None:
+                    results = self._buffer(64, train_columns)
+                names.append(tenant)
+                self._select_into(results, len(names) - 1, train_df)
+        except KeyError as e:
+            print(f"Error: {e}")
+            raise
+        except Exception as e:
+            print(f"An unexpected error occurred: {e}")
+            raise
+        if results is None:
+            results = self._buffer(1, [])
+        results.names['Tenant'] = np.asarray(names, dtype=object)
+        return results.to_frame()
+
+    def select_to_db(self, tenants, engine, table='tenant_best_ideal_functions', chunksize=10000):
+        """
+        Select the best ideal functions for every tenant and write them to an SQLite table.
+
+        Args:
+            tenants (dict or iterable): Tenant training sets, as for select_many.
+            engine (Engine): SQLAlchemy engine of the SQLite database.
+            table (str): Name of the table to replace.
+            chunksize (int): Number of rows passed to each executemany call.
+
+        Returns:
+            DataFrame: The selections that were written.
+        """
+        selections = self.select_many(tenants)
+        with bulk_load(engine) as cursor:
+            write_table(cursor, table, selections, chunksize)
+        return selections
+
+    def _buffer(self, capacity, train_columns):
+        return ResultBuffer({'Deviation': np.float64, 'Max Deviation': np.float64, 'Threshold': np.float64},
+                            {'Tenant': [], 'Train Function': list(train_columns),
+                             'Ideal Function': self.ideal_columns},
+                            capacity=capacity)
+
+    def _select_into(self, results, tenant_code, train_df):
+        """
+        Score one training set against the catalogue and append its selections.
+        """
+        train_columns = train_df.columns.drop('x')
+        train_matrix = train_df.loc[range(len(train_df)), train_columns].to_numpy(dtype=np.float64)
+        deviations = self.engine.sum_squared_deviations(train_matrix)
+        # argmin keeps the first ideal column on ties, like the stable sort of FunctionSelector
+        best = deviations.argmin(axis=1)
+        max_deviations = np.abs(train_matrix - self.ideal_matrix[:, best]).max(axis=0, initial=0.0)
+
+        # Tenants may name their training functions differently, so extend the shared names
+        known = {name: code for code, name in enumerate(results.names['Train Function'])}
+        new = [name for name in train_columns if name not in known]
+        if new:
+            results.names['Train Function'] = np.concatenate([results.names['Train Function'],
+                                                              np.asarray(new, dtype=object)])
+            base = len(known)
+            known.update((name, base + pos) for pos, name in enumerate(new))
+        results.append(**{'Tenant': tenant_code,
+                          'Train Function': [known[name] for name in train_columns],
+                          'Ideal Function': best,
+                          'Deviation': deviations[np.arange(len(best)), best],
+                          'Max Deviation': max_deviations,
+                          'Threshold': max_deviations * np.sqrt(2)})
@@ -0,0 +1,142 @@
+import argparse
+import os
+import sys
+
+# Only the standard library is imported here. pandas, SQLAlchemy and Bokeh are imported
+# inside the commands that need them, so starting the CLI stays cheap.
+
+BASE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DEFAULT_DB = 'sqlite:///' + os.path.join(BASE_PATH, 'data.db')
+BEST_TABLE = 'best_ideal_functions'
+RESULTS_TABLE = 'test_results'
+
+def _data_handler(args):
+    from src.data_handler import DataHandler
+    return DataHandler(args.train, args.ideal, args.test, args.db)
+
+def ingest(args):
+    """
+    Load the CSV files and write them to the database.
+    """
+    data_handler = _data_handler(args)
+    data_handler.load_data()
+    data_handler.save_to_db(chunksize=args.chunksize)
+    return 0
+
+def select(args):
+    """
+    Select the best ideal function per training function from the database tables.
+    """
+    from src.data_handler import bulk_load, write_table
+    from src.function_selector import FunctionSelector
+
+    data_handler = _data_handler(args)
+    selector = FunctionSelector(data_handler.read_table('train'), data_handler.read_table('ideal'),
+                                workers=args.workers)
+    if args.top_k > 1:
+        best_ideal_functions = selector.select_top_k(k=args.top_k)
+    else:
+        selector.calculate_deviations()
+        best_ideal_functions = selector.select_ideal_functions()
+    with bulk_load(data_handler.engine) as cursor:
+        write_table(cursor, BEST_TABLE, best_ideal_functions)
+    return 0
+
+def map_test_data(args):
+    """
+    Map the test data to the selected ideal functions and write the results to the database.
+    """
+    import pandas as pd
+    from src.test_mapper import TestMapper
+
+    data_handler = _data_handler(args)
+    best_ideal_functions = pd.read_sql(f'SELECT * FROM "{BEST_TABLE}"', data_handler.engine)
+    if 'Rank' in best_ideal_functions.columns:
+        best_ideal_functions = best_ideal_functions[best_ideal_functions['Rank'] == 1]
+    ideal_df = data_handler.read_table('ideal', list(best_ideal_functions['Ideal Function'].unique()))
+    train_df = data_handler.read_table('train', list(best_ideal_functions['Train Function'].unique()))
+    if args.source == 'csv':
+        chunks = data_handler.iter_test_chunks(args.chunksize)
+    else:
+        chunks = [data_handler.read_table('test')]
+
+    mapper = TestMapper(None, ideal_df, train_df, best_ideal_functions,
+                        x_policy=args.x_policy, match_policy=args.match_policy)
+    written = mapper.map_chunks_to_db(chunks, data_handler.engine, RESULTS_TABLE)
+    print(f"Mapped {written} test points to '{RESULTS_TABLE}'")
+    return 0
+
+def plot(args):
+    """
+    Plot the mapping results from the database, or export them with --output-dir.
+    """
+    import pandas as pd
+    from src.visualizer import Visualizer
+
+    data_handler = _data_handler(args)
+    test_results_df = pd.read_sql(f'SELECT * FROM "{RESULTS_TABLE}"', data_handler.engine)
+    visualizer = Visualizer.for_data(data_handler.read_table('train'), data_handler.read_table('ideal'), test_results_df)
+    if args.output_dir is None:
+        visualizer.visualize()
+    else:
+        paths = visualizer.export(args.output_dir, args.format, workers=args.workers)
+        print(f"Wrote {len(paths)} plots to {args.output_dir}")
+    return 0
+
+def build_parser():
+    """
+    Build the argument parser with the ingest, select, map and plot subcommands.
+
+    Returns:
+        ArgumentParser: The parser. Each subcommand sets the function to run as 'command'.
+    """
+    parser = argparse.ArgumentParser(prog='python -m src',
+                                     description="Select ideal functions and map the test data to them.")
+    parser.add_argument('--db', default=DEFAULT_DB, help="SQLAlchemy URL of the database (default: data.db)")
+    parser.add_argument('--train', default=os.path.join(BASE_PATH, 'data/train.csv'), help="Training data CSV file")
+    parser.add_argument('--ideal', default=os.path.join(BASE_PATH, 'data/ideal.csv'), help="Ideal functions CSV file")
+    parser.add_argument('--test', default=os.path.join(BASE_PATH, 'data/test.csv'), help="Test data CSV file")
+    subparsers = parser.add_subparsers(dest='name', required=True)
+
+    ingest_parser = subparsers.add_parser('ingest', help="Load the CSV files into the database")
+    ingest_parser.add_argument('--chunksize', type=int, default=10000, help="Rows per executemany call")
+    ingest_parser.set_defaults(command=ingest)
+
+    select_parser = subparsers.add_parser('select', help="Select the best ideal functions")
+    select_parser.add_argument('--workers', type=int, default=1,
+                               help="Number of processes for the deviation search (default: 1)")
+    select_parser.add_argument('--top-k', type=int, default=1, help="Number of candidates kept per training function")
+    select_parser.set_defaults(command=select)
+
+    map_parser = subparsers.add_parser('map', help="Map the test data to the selected ideal functions")
+    map_parser.add_argument('--source', choices=('csv', 'db'), default='csv',
+                            help="Stream the test data from the CSV file or read it from the database")
+    map_parser.add_argument('--chunksize', type=int, default=100000, help="Test points mapped per chunk")
+    map_parser.add_argument('--x-policy', choices=('reject', 'nearest', 'interpolate'), default='reject')
+    map_parser.add_argument('--match-policy', choices=('first', 'best'), default='first')
+    map_parser.set_defaults(command=map_test_data)
+
+    plot_parser = subparsers.add_parser('plot', help="Plot the mapping results")
+    plot_parser.add_argument('--output-dir', metavar='DIR',
+                             help="Export one plot file per ideal function to this directory instead of showing them")
+    plot_parser.add_argument('--format', choices=('html', 'json', 'png'), default='html',
+                             help="Format of the exported plots (default: html)")
+    plot_parser.add_argument('--workers', type=int, default=1, help="Number of processes generating the plots")
+    plot_parser.set_defaults(command=plot)
+    return parser
+
+def main(argv=None):
+    """
+    Run a subcommand.
+
+    Args:
+        argv (list): Command line arguments, defaults to sys.argv[1:].
+
+    Returns:
+        int: Exit status.
+    """
+    args = build_parser().parse_args(argv)
+    return args.command(args)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,78 @@
+import json
+import struct
+import numpy as np
+import pandas as pd
+
+MAGIC = b'IDLCOL01'
+ALIGNMENT = 64
+
+def write_columnar(df, path):
+    """
+    Write a numeric DataFrame to the columnar binary format.
+
+    The file holds the magic bytes, the length of a JSON header with the column names
+    and shape, the header itself, and then the values as one contiguous float64 matrix
+    in column-major order, aligned to 64 bytes. The first column is the x grid, so every
+    function is a contiguous run of float64 values next to it.
+
+    Args:
+        df (DataFrame): Data with 'x' as its first column.
+        path (str): Path of the file to write.
+    """
+    if len(df.columns) == 0 or df.columns[0] != 'x':
+        raise KeyError("'x' must be the first column")
+    header = {
+        'columns': [str(col) for col in df.columns],
+        'rows': len(df),
+        'dtype': '<f8',
+        'order': 'F'
+    }
+    header_bytes = json.dumps(header).encode('utf-8')
+    data_offset = _align(len(MAGIC) + 8 + len(header_bytes))
+
+    values = np.asfortranarray(df.to_numpy(dtype='<f8'))
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b'\0' * (data_offset - f.tell()))
+        f.write(values.tobytes(order='F'))
+
+def read_columnar_header(path):
+    """
+    Read the header of a columnar binary file.
+
+    Returns:
+        dict: Column names, row count, dtype and the byte offset of the matrix.
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a columnar ideal functions file")
+        (header_length,) = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(header_length).decode('utf-8'))
+    header['data_offset'] = _align(len(MAGIC) + 8 + header_length)
+    return header
+
+def read_columnar(path):
+    """
+    Open a columnar binary file as a DataFrame backed by a read-only memory map.
+
+    The DataFrame shares memory with the mapped file, so opening it costs no parsing
+    and processes that open the same file share one page-cached copy.
+
+    Args:
+        path (str): Path of the file to open.
+
+    Returns:
+        DataFrame: The stored columns, read-only.
+    """
+    header = read_columnar_header(path)
+    shape = (header['rows'], len(header['columns']))
+    if shape[0] == 0:
+        return pd.DataFrame(np.empty(shape), columns=header['columns'])
+    values = np.memmap(path, dtype=header['dtype'], mode='r', offset=header['data_offset'],
+                       shape=shape, order=header['order'])
+    return pd.DataFrame(values, columns=header['columns'], copy=False)
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
@@ -1,5 +1,14 @@
+import hashlib
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+import numpy as np
 import pandas as pd
-from sqlalchemy import create_engine
+from src.columnar_format import read_columnar, write_columnar
+
+TABLES = ('train', 'ideal', 'test')
+FINGERPRINTS_TABLE = 'table_fingerprints'
 
 class BaseDataHandler:
     """
@@ -7,7 +16,19 @@ class BaseDataHandler:
     """
     def __init__(self, db_path='sqlite:///data.db'):
         self.db_path = db_path
-        self.engine = create_engine(self.db_path)
+        self._engine = None
+
+    @property
+    def engine(self):
+        """
+        SQLAlchemy engine of the database, created on first use so CSV-only runs never open it.
+
+        SQLAlchemy itself is only imported here, so importing the module does not load it.
+        """
+        if self._engine is None:
+            from sqlalchemy import create_engine
+            self._engine = create_engine(self.db_path)
+        return self._engine
 
 class DataHandler(BaseDataHandler):
     """
@@ -24,14 +45,16 @@ class DataHandler(BaseDataHandler):
         self.ideal_path = ideal_path
         self.test_path = test_path
 
-    def load_data(self):
+    def load_data(self, tables=TABLES):
         """
         Load data from CSV files into pandas DataFrames.
+
+        Args:
+            tables (tuple): The inputs to load, by default all of 'train', 'ideal' and 'test'.
         """
         try:
-            self.train_df = pd.read_csv(self.train_path)
-            self.ideal_df = pd.read_csv(self.ideal_path)
-            self.test_df = pd.read_csv(self.test_path)
+            for table in tables:
+                setattr(self, f'{table}_df', pd.read_csv(self._csv_path(table)))
         except FileNotFoundError as e:
             print(f"Error: {e}")
             raise
@@ -45,18 +68,289 @@ class DataHandler(BaseDataHandler):
             print(f"An unexpected error occurred: {e}")
             raise
 
-    def save_to_db(self):
+    def _csv_path(self, table):
+        if table not in TABLES:
+            raise KeyError(f"Unknown table '{table}', expected one of {TABLES}")
+        return getattr(self, f'{table}_path')
+
+    def load_from_db(self, columns=None, x_range=None, tables=TABLES):
+        """
+        Load the train, ideal and test tables from the SQLite database instead of the CSV files.
+
+        Args:
+            columns (dict): Optional table name mapped to the function columns to read,
+                e.g. {'ideal': ['y3', 'y7']}. The 'x' column is always read and tables
+                that are not listed are read in full.
+            x_range (tuple): Optional (low, high) bounds on x, applied in SQL. Either bound
+                may be None.
+            tables (tuple): The tables to load, by default all of 'train', 'ideal' and 'test'.
+        """
+        columns = columns or {}
+        try:
+            for table in tables:
+                setattr(self, f'{table}_df', self.read_table(table, columns.get(table), x_range))
+        except KeyError as e:
+            print(f"Error: {e}")
+            raise
+        except Exception as e:
+            print(f"An error occurred while loading from the database: {e}")
+            raise
+
+    def read_table(self, table, columns=None, x_range=None, chunksize=100000):
+        """
+        Read selected columns of a table into a float64 DataFrame.
+
+        Only the requested columns are selected and the x range filter is part of the
+        query, so rows and columns that are not needed are never materialised.
+
+        Args:
+            table (str): Name of the table.
+            columns (list): Function columns to read besides 'x', None for all of them.
+            x_range (tuple): Optional (low, high) bounds on x. Either bound may be None.
+            chunksize (int): Number of rows fetched from the cursor at a time.
+
+        Returns:
+            DataFrame: The requested columns with float64 dtype, in insertion order.
+        """
+        connection = self.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute(f'PRAGMA table_info({_quote_identifier(table)})')
+            available = [row[1] for row in cursor.fetchall()]
+            if not available:
+                raise KeyError(f"Table '{table}' not found in the database")
+            if columns is None:
+                columns = [col for col in available if col != 'x']
+            selected = ['x'] + [col for col in columns if col != 'x']
+            missing = [col for col in selected if col not in available]
+            if missing:
+                raise KeyError(f"Columns {missing} not found in table '{table}'")
+
+            query = 'SELECT {} FROM {}'.format(', '.join(_quote_identifier(col) for col in selected),
+                                              _quote_identifier(table))
+            conditions, params = [], []
+            low, high = x_range if x_range is not None else (None, None)
+            if low is not None:
+                conditions.append('"x" >= ?')
+                params.append(float(low))
+            if high is not None:
+                conditions.append('"x" <= ?')
+                params.append(float(high))
+            if conditions:
+                query += ' WHERE ' + ' AND '.join(conditions)
+            cursor.execute(query + ' ORDER BY rowid', params)
+
+            blocks = []
+            while True:
+                rows = cursor.fetchmany(chunksize)
+                if not rows:
+                    break
+                blocks.append(np.array(rows, dtype=np.float64))
+            cursor.close()
+        finally:
+            connection.close()
+
+        values = np.concatenate(blocks) if blocks else np.empty((0, len(selected)), dtype=np.float64)
+        return pd.DataFrame(values, columns=selected)
+
+    def save_to_db(self, chunksize=10000, tables=TABLES):
         """
         Save pandas DataFrames to SQLite database.
+
+        The tables are written in one transaction with executemany in chunks of
+        chunksize rows, explicit REAL column types and relaxed durability pragmas during
+        the load. The indexes on 'x' are created after the rows are in, and the content
+        hash of every table is recorded for table_fingerprint.
+
+        Args:
+            chunksize (int): Number of rows passed to each executemany call.
+            tables (tuple): The tables to write, by default all of 'train', 'ideal' and 'test'.
+
+        Returns:
+            dict: Rows, seconds and rows per second for each table.
         """
         try:
-            self.train_df.to_sql('train', self.engine, if_exists='replace', index=False)
-            self.ideal_df.to_sql('ideal', self.engine, if_exists='replace', index=False)
-            self.test_df.to_sql('test', self.engine, if_exists='replace', index=False)
+            self.save_stats = {}
+            with bulk_load(self.engine) as cursor:
+                for table in tables:
+                    df = getattr(self, f'{table}_df')
+                    start = time.perf_counter()
+                    write_table(cursor, table, df, chunksize)
+                    elapsed = time.perf_counter() - start
+                    _record_fingerprint(cursor, table, content_fingerprint(df))
+                    self.save_stats[table] = {
+                        'rows': len(df),
+                        'seconds': elapsed,
+                        'rows_per_second': len(df) / elapsed if elapsed > 0 else float('inf')
+                    }
+            for table, stats in self.save_stats.items():
+                print(f"Saved {stats['rows']} rows to '{table}' ({stats['rows_per_second']:,.0f} rows/s)")
+            return self.save_stats
         except Exception as e:
             print(f"An error occurred while saving to the database: {e}")
             raise
 
+    def table_fingerprint(self, table):
+        """
+        Get the content hash of a database table, as recorded when save_to_db wrote it.
+
+        Tables written before hashes were recorded are hashed once from the database and
+        the hash is recorded, so later calls never scan the table.
+
+        Args:
+            table (str): Name of the table.
+
+        Returns:
+            str: Hex digest, see content_fingerprint.
+        """
+        connection = self.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?", (FINGERPRINTS_TABLE,))
+            row = None
+            if cursor.fetchone() is not None:
+                cursor.execute(f'SELECT "Hash" FROM {_quote_identifier(FINGERPRINTS_TABLE)} WHERE "Table" = ?', (table,))
+                row = cursor.fetchone()
+            cursor.close()
+        finally:
+            connection.close()
+        if row is not None:
+            return row[0]
+
+        blocks = self.iter_ideal_blocks(source='db') if table == 'ideal' else [self.read_table(table)]
+        fingerprint = content_fingerprint(blocks)
+        with bulk_load(self.engine) as cursor:
+            _record_fingerprint(cursor, table, fingerprint)
+        return fingerprint
+
+    def save_ideal_columnar(self, path):
+        """
+        Save the ideal functions in the columnar binary format.
+
+        Args:
+            path (str): Path of the file to write.
+        """
+        try:
+            write_columnar(self.ideal_df, path)
+        except Exception as e:
+            print(f"An error occurred while writing {path}: {e}")
+            raise
+
+    def load_ideal_columnar(self, path):
+        """
+        Load the ideal functions from a columnar binary file instead of the CSV file.
+
+        The DataFrame is backed by a read-only memory map of the file, so nothing is
+        parsed or copied up front.
+
+        Args:
+            path (str): Path of the file written by save_ideal_columnar.
+        """
+        try:
+            self.ideal_df = read_columnar(path)
+        except FileNotFoundError as e:
+            print(f"Error: {e}")
+            raise
+        except ValueError as e:
+            print(f"Error: {e}")
+            raise
+
+    def iter_ideal_blocks(self, block_size=1000, source='csv', chunksize=10000):
+        """
+        Read the ideal functions in fixed-size blocks of columns.
+
+        Only one block is held in memory at a time, so wide ideal catalogues can be
+        processed without materialising the full table. The CSV source parses the file
+        once, in chunks of rows, into a temporary column-major float64 file and cuts the
+        blocks from that, so it needs rows x columns x 8 bytes of temporary disk space.
+        Catalogues that are read repeatedly are better served by the 'db' source or the
+        columnar format of save_ideal_columnar, which need no parsing at all.
+
+        Args:
+            block_size (int): Number of ideal function columns per block.
+            source (str): Either 'csv' to read from the ideal CSV file or 'db' to read
+                from the 'ideal' table of the SQLite database.
+            chunksize (int): Number of CSV rows parsed at a time.
+
+        Yields:
+            DataFrame: The 'x' column followed by the next block of ideal functions.
+        """
+        if block_size < 1:
+            raise ValueError("block_size must be at least 1")
+        try:
+            if source == 'csv':
+                yield from self._iter_csv_ideal_blocks(block_size, chunksize)
+            elif source == 'db':
+                columns = pd.read_sql('SELECT * FROM ideal LIMIT 0', self.engine).columns.drop('x')
+                for start in range(0, len(columns), block_size):
+                    block = ['x'] + list(columns[start:start + block_size])
+                    query = 'SELECT {} FROM ideal'.format(', '.join(_quote_identifier(col) for col in block))
+                    yield pd.read_sql(query, self.engine)
+            else:
+                raise ValueError(f"Unknown source '{source}', expected 'csv' or 'db'")
+        except FileNotFoundError as e:
+            print(f"Error: {e}")
+            raise
+        except KeyError as e:
+            print(f"Error: {e}")
+            raise
+        except ValueError as e:
+            print(f"Error: {e}")
+            raise
+
+    def _iter_csv_ideal_blocks(self, block_size, chunksize):
+        """
+        Parse the ideal CSV file once into a temporary column-major file and yield its column blocks.
+        """
+        columns = pd.read_csv(self.ideal_path, nrows=0).columns
+        x_position = columns.get_loc('x')
+        # Every record takes at least one line, so the line count bounds the number of rows.
+        # Blank lines and quoted line breaks make it an overestimate, only parsed rows are used.
+        with open(self.ideal_path, 'rb') as f:
+            max_rows = sum(1 for _ in f) - 1
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            values = np.memmap(os.path.join(tmp_dir, 'ideal.f8'), dtype=np.float64, mode='w+',
+                               shape=(max(max_rows, 1), len(columns)), order='F')
+            rows = 0
+            with pd.read_csv(self.ideal_path, chunksize=chunksize) as reader:
+                for chunk in reader:
+                    if rows + len(chunk) > max_rows:
+                        raise ValueError(f"{self.ideal_path} has more rows than lines ending in a newline, "
+                                         "check its line endings")
+                    values[rows:rows + len(chunk)] = chunk.to_numpy(dtype=np.float64)
+                    rows += len(chunk)
+            values.flush()
+
+            x = np.array(values[:rows, x_position])
+            functions = [pos for pos in range(len(columns)) if pos != x_position]
+            for start in range(0, len(functions), block_size):
+                positions = functions[start:start + block_size]
+                block = pd.DataFrame(np.array(values[:rows, positions]), columns=columns[positions])
+                block.insert(0, 'x', x)
+                yield block
+            del values
+
+    def iter_test_chunks(self, chunksize=100000):
+        """
+        Read the test data CSV file in chunks of rows.
+
+        Args:
+            chunksize (int): Number of test points per chunk.
+
+        Yields:
+            DataFrame: The next chunk of test data.
+        """
+        try:
+            with pd.read_csv(self.test_path, chunksize=chunksize) as reader:
+                yield from reader
+        except FileNotFoundError as e:
+            print(f"Error: {e}")
+            raise
+        except pd.errors.ParserError as e:
+            print(f"Error: {e}")
+            raise
+
     def get_train_data(self):
         """
         Get the training data DataFrame.
@@ -83,3 +377,124 @@ class DataHandler(BaseDataHandler):
             DataFrame: Test data.
         """
         return self.test_df
+
+def _quote_identifier(name):
+    """
+    Quote a column or table name for use in an SQLite statement.
+    """
+    return '"{}"'.format(str(name).replace('"', '""'))
+
+def update_fingerprint(digest, block, first):
+    """
+    Add a block of columns to a content hash, independent of how the columns are split into blocks.
+
+    Args:
+        digest (hashlib object): The hash to update, e.g. hashlib.sha256().
+        block (DataFrame): 'x' and a block of function columns.
+        first (bool): Whether this is the first block, whose 'x' values are hashed.
+    """
+    if first:
+        digest.update(np.ascontiguousarray(block['x'].to_numpy(dtype=np.float64)).tobytes())
+    for column in block.columns.drop('x'):
+        digest.update(str(column).encode('utf-8') + b'\0')
+        digest.update(np.ascontiguousarray(block[column].to_numpy(dtype=np.float64)).tobytes())
+
+def content_fingerprint(blocks):
+    """
+    Calculate the SHA-256 content hash of a table of functions.
+
+    Args:
+        blocks (DataFrame or iterable): The table, or DataFrames holding 'x' and
+            consecutive blocks of its columns, e.g. from DataHandler.iter_ideal_blocks.
+
+    Returns:
+        str: Hex digest over the x values, the column names and the float64 values.
+    """
+    if isinstance(blocks, pd.DataFrame):
+        blocks = [blocks]
+    digest = hashlib.sha256()
+    for position, block in enumerate(blocks):
+        update_fingerprint(digest, block, position == 0)
+    return digest.hexdigest()
+
+def _record_fingerprint(cursor, table, fingerprint):
+    cursor.execute(f'CREATE TABLE IF NOT EXISTS {_quote_identifier(FINGERPRINTS_TABLE)} '
+                   '("Table" TEXT PRIMARY KEY, "Hash" TEXT)')
+    cursor.execute(f'INSERT OR REPLACE INTO {_quote_identifier(FINGERPRINTS_TABLE)} VALUES (?, ?)',
+                   (table, fingerprint))
+
+@contextmanager
+def bulk_load(engine):
+    """
+    Open one SQLite transaction tuned for bulk loading.
+
+    Switches the database to WAL and turns synchronous writes off for the duration
+    of the load, then commits and restores synchronous=NORMAL. On error the whole
+    load is rolled back.
+
+    Args:
+        engine (Engine): SQLAlchemy engine of the SQLite database.
+
+    Yields:
+        Cursor: DBAPI cursor inside the open transaction.
+    """
+    connection = engine.raw_connection()
+    driver_connection = connection.driver_connection
+    isolation_level = driver_connection.isolation_level
+    driver_connection.isolation_level = None
+    cursor = driver_connection.cursor()
+    try:
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=OFF')
+        cursor.execute('BEGIN')
+        try:
+            yield cursor
+            cursor.execute('COMMIT')
+        except BaseException:
+            cursor.execute('ROLLBACK')
+            raise
+        finally:
+            cursor.execute('PRAGMA synchronous=NORMAL')
+    finally:
+        cursor.close()
+        driver_connection.isolation_level = isolation_level
+        connection.close()
+
+def write_table(cursor, table, df, chunksize=10000, replace=True):
+    """
+    Replace or append to an SQLite table with the contents of a DataFrame.
+
+    Numeric columns are stored as REAL and all other columns as TEXT. Rows are inserted
+    with executemany in chunks, and an index on 'x' is created after the load when the
+    table has that column.
+
+    Args:
+        cursor (Cursor): DBAPI cursor, usually from bulk_load.
+        table (str): Name of the table to replace.
+        df (DataFrame): Data to write.
+        chunksize (int): Number of rows passed to each executemany call.
+        replace (bool): Drop and recreate the table, or append to it if it exists.
+    """
+    if chunksize < 1:
+        raise ValueError("chunksize must be at least 1")
+    numeric = [pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+               for dtype in df.dtypes]
+    definitions = ', '.join(
+        f"{_quote_identifier(col)} {'REAL' if is_numeric else 'TEXT'}"
+        for col, is_numeric in zip(df.columns, numeric)
+    )
+    if replace:
+        cursor.execute(f'DROP TABLE IF EXISTS {_quote_identifier(table)}')
+    cursor.execute(f'CREATE TABLE IF NOT EXISTS {_quote_identifier(table)} ({definitions})')
+
+    insert = 'INSERT INTO {} VALUES ({})'.format(_quote_identifier(table), ', '.join('?' * len(df.columns)))
+    columns = [
+        df[col].to_numpy(dtype=np.float64) if is_numeric else df[col].astype(object).where(df[col].notna(), None).to_numpy()
+        for col, is_numeric in zip(df.columns, numeric)
+    ]
+    for start in range(0, len(df), chunksize):
+        chunk = [column[start:start + chunksize].tolist() for column in columns]
+        cursor.executemany(insert, zip(*chunk))
+
+    if 'x' in df.columns:
+        cursor.execute('CREATE INDEX IF NOT EXISTS {} ON {} ("x")'.format(_quote_identifier(f'idx_{table}_x'), _quote_identifier(table)))
@@ -0,0 +1,73 @@
+import numpy as np
+
+def minmax_decimate(x, y, n_out):
+    """
+    Reduce a line series to at most n_out points, keeping the extremes of each bucket.
+
+    The points are split into n_out // 2 buckets of consecutive points and the minimum
+    and maximum of each bucket are kept, so peaks and dips stay visible at screen
+    resolution.
+
+    Args:
+        x (array-like): x values, in plotting order.
+        y (array-like): y values.
+        n_out (int): Maximum number of points to keep.
+
+    Returns:
+        tuple: The decimated x and y arrays.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if n_out < 2:
+        raise ValueError("n_out must be at least 2")
+    if len(x) <= n_out:
+        return x, y
+
+    n_buckets = n_out // 2
+    edges = np.linspace(0, len(y), n_buckets + 1).astype(np.intp)
+    buckets = np.repeat(np.arange(n_buckets), np.diff(edges))
+    # Within each bucket the positions are ordered by y, so the ends are the extremes
+    order = np.lexsort((y, buckets))
+    keep = np.unique(np.concatenate([order[edges[:-1]], order[edges[1:] - 1]]))
+    return x[keep], y[keep]
+
+def lttb(x, y, n_out):
+    """
+    Reduce a line series to n_out points with the Largest-Triangle-Three-Buckets algorithm.
+
+    The first and last points are kept. From every bucket in between, LTTB keeps the
+    point that forms the largest triangle with the previously kept point and the mean
+    of the next bucket, which preserves the visual shape of the line.
+
+    Args:
+        x (array-like): x values, in plotting order.
+        y (array-like): y values.
+        n_out (int): Number of points to keep.
+
+    Returns:
+        tuple: The decimated x and y arrays.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if n_out < 3:
+        raise ValueError("n_out must be at least 3")
+    if len(x) <= n_out:
+        return x, y
+
+    xf = x.astype(np.float64)
+    yf = y.astype(np.float64)
+    edges = np.linspace(1, len(x) - 1, n_out - 1).astype(np.intp)
+    keep = np.empty(n_out, dtype=np.intp)
+    keep[0] = 0
+    keep[-1] = len(x) - 1
+    for bucket in range(n_out - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        next_stop = edges[bucket + 2] if bucket + 2 < len(edges) else len(x)
+        next_x = xf[stop:next_stop].mean()
+        next_y = yf[stop:next_stop].mean()
+        prev_x, prev_y = xf[keep[bucket]], yf[keep[bucket]]
+        area = np.abs((prev_x - next_x) * (yf[start:stop] - prev_y) - (prev_x - xf[start:stop]) * (next_y - prev_y))
+        keep[bucket + 1] = start + int(np.argmax(area))
+    return x[keep], y[keep]
+
+DECIMATORS = {'minmax': minmax_decimate, 'lttb': lttb}
@@ -0,0 +1,73 @@
+import numpy as np
+
+class DeviationEngine:
+    """
+    DeviationEngine class for computing sums of squared deviations in one batched pass.
+
+    The ideal matrix is centred on its per-row mean and its column norms are computed
+    once, so every train-vs-ideal sum of squared deviations follows from the expansion
+    ||a||^2 + ||b||^2 - 2 * a^T b with a single matrix product. Pairs whose result is
+    small compared to the norms involved lose precision to cancellation, so they are
+    recomputed directly.
+
+    Attributes:
+        centre (ndarray): Per-row shift applied to both train and ideal values.
+        ideal_centred (ndarray): Centred ideal matrix of shape (rows, ideal functions).
+        ideal_sq_norms (ndarray): Squared column norms of the centred ideal matrix.
+    """
+    # Relative size below which an expanded result is recomputed directly
+    refine_tolerance = 1e-6
+
+    def __init__(self, ideal_matrix):
+        ideal_matrix = np.asarray(ideal_matrix, dtype=np.float64)
+        if ideal_matrix.ndim != 2:
+            raise ValueError("ideal_matrix must be two-dimensional (rows, functions)")
+        if ideal_matrix.shape[1]:
+            self.centre = ideal_matrix.mean(axis=1, keepdims=True)
+        else:
+            self.centre = np.zeros((ideal_matrix.shape[0], 1))
+        self.ideal_centred = ideal_matrix - self.centre
+        self.ideal_sq_norms = np.einsum('ij,ij->j', self.ideal_centred, self.ideal_centred)
+
+    @classmethod
+    def from_centred(cls, centre, ideal_centred, ideal_sq_norms):
+        """
+        Create an engine from an already centred ideal matrix, e.g. one held in shared memory.
+
+        Returns:
+            DeviationEngine: Engine using the given arrays without copying them.
+        """
+        engine = cls.__new__(cls)
+        engine.centre = centre
+        engine.ideal_centred = ideal_centred
+        engine.ideal_sq_norms = ideal_sq_norms
+        return engine
+
+    def sum_squared_deviations(self, train_matrix):
+        """
+        Calculate the sum of squared deviations for every train and ideal column pair.
+
+        Args:
+            train_matrix (ndarray): Training values of shape (rows, train functions).
+
+        Returns:
+            ndarray: Deviations of shape (train functions, ideal functions).
+        """
+        train_matrix = np.asarray(train_matrix, dtype=np.float64)
+        if train_matrix.shape[0] != self.ideal_centred.shape[0]:
+            raise ValueError(
+                f"train_matrix has {train_matrix.shape[0]} rows, expected {self.ideal_centred.shape[0]}"
+            )
+        train_centred = train_matrix - self.centre
+        train_sq_norms = np.einsum('ij,ij->j', train_centred, train_centred)
+
+        scale = train_sq_norms[:, None] + self.ideal_sq_norms[None, :]
+        deviations = scale - 2.0 * (train_centred.T @ self.ideal_centred)
+        np.maximum(deviations, 0.0, out=deviations)
+
+        # Recompute the pairs that are close to each other relative to their magnitude
+        train_idx, ideal_idx = np.nonzero(deviations <= self.refine_tolerance * scale)
+        if len(train_idx):
+            diff = train_centred[:, train_idx] - self.ideal_centred[:, ideal_idx]
+            deviations[train_idx, ideal_idx] = np.einsum('ij,ij->j', diff, diff)
+        return deviations
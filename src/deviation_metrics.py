@@ -0,0 +1,85 @@
+from abc import ABC, abstractmethod
+import numpy as np
+
+class DeviationMetric(ABC):
+    """
+    Base class for deviation metrics that can be accumulated over blocks of rows.
+
+    A metric keeps one accumulator per candidate and updates it block by block. The
+    accumulator never decreases as rows are added, and finalize is non-decreasing in
+    it, so finalizing a partial accumulator gives a lower bound on the final value.
+    This lets a search abandon a candidate as soon as its bound is already worse than
+    the candidates it has to beat.
+
+    Attributes:
+        name (str): Name of the metric.
+    """
+    name = None
+
+    @abstractmethod
+    def accumulate(self, acc, diff):
+        """
+        Add a block of rows to the accumulators.
+
+        Args:
+            acc (ndarray): Accumulators, one per candidate.
+            diff (ndarray): Deviations of shape (rows in block, candidates).
+
+        Returns:
+            ndarray: The updated accumulators.
+        """
+
+    def finalize(self, acc, n_rows):
+        """
+        Turn accumulators into metric values, given the total number of rows.
+        """
+        return acc
+
+class SumSquaredError(DeviationMetric):
+    """
+    Sum of squared deviations, the least-squares criterion used by FunctionSelector.
+    """
+    name = 'sse'
+
+    def accumulate(self, acc, diff):
+        return acc + np.einsum('ij,ij->j', diff, diff)
+
+class MaxAbsoluteError(DeviationMetric):
+    """
+    Largest absolute deviation over all rows.
+    """
+    name = 'max_abs'
+
+    def accumulate(self, acc, diff):
+        return np.maximum(acc, np.abs(diff).max(axis=0, initial=0.0))
+
+class MeanAbsoluteError(DeviationMetric):
+    """
+    Mean absolute deviation over all rows.
+    """
+    name = 'mae'
+
+    def accumulate(self, acc, diff):
+        return acc + np.abs(diff).sum(axis=0)
+
+    def finalize(self, acc, n_rows):
+        return acc / n_rows if n_rows else acc
+
+METRICS = {metric.name: metric for metric in (SumSquaredError(), MaxAbsoluteError(), MeanAbsoluteError())}
+
+def get_metric(metric):
+    """
+    Resolve a metric name or instance.
+
+    Args:
+        metric (str or DeviationMetric): One of the names in METRICS, or a metric instance.
+
+    Returns:
+        DeviationMetric: The metric.
+    """
+    if isinstance(metric, DeviationMetric):
+        return metric
+    try:
+        return METRICS[metric]
+    except KeyError:
+        raise ValueError(f"Unknown metric '{metric}', expected one of {sorted(METRICS)}") from None
@@ -1,4 +1,10 @@
+import heapq
+import numpy as np
 import pandas as pd
+from src.deviation_engine import DeviationEngine
+from src.deviation_metrics import get_metric
+from src.parallel_deviation import parallel_sum_squared_deviations, resolve_workers
+from src.results import categorical
 
 class BaseFunctionSelector:
     """
@@ -15,9 +21,12 @@ class FunctionSelector(BaseFunctionSelector):
     Attributes:
         deviation_df (DataFrame): DataFrame to store the deviations.
         best_ideal_functions (DataFrame): DataFrame to store the best ideal functions.
+        workers (int or None): Number of processes used for the deviation search, None for
+            one per CPU. The default of 1 computes everything in this process.
     """
-    def __init__(self, train_df, ideal_df):
+    def __init__(self, train_df, ideal_df, workers=1):
         super().__init__(train_df, ideal_df)
+        self.workers = resolve_workers(workers)
         self.deviation_df = pd.DataFrame()
         self.best_ideal_functions = pd.DataFrame()
 
@@ -25,20 +34,24 @@ class FunctionSelector(BaseFunctionSelector):
         """
         Calculate the sum of squared deviations between training data and ideal functions.
         """
-        print("Calculating deviations...") 
+        print("Calculating deviations...")
         try:
-            results = []
-            for train_col in self.train_df.columns[1:]:
-                for ideal_col in self.ideal_df.columns[1:]:
-                    deviation = 0
-                    for index in range(len(self.train_df)):
-                        train_value = self.train_df.at[index, train_col]
-                        ideal_value = self.ideal_df.at[index, ideal_col]
-                        deviation += (train_value - ideal_value) ** 2
-
-                    results.append((train_col, ideal_col, deviation))      
-                        
-            self.deviation_df = pd.DataFrame(results, columns=['Train Function', 'Ideal Function', 'Deviation'])
+            train_columns = self.train_df.columns.drop('x')
+            ideal_columns = self.ideal_df.columns.drop('x')
+            rows = range(len(self.train_df))
+            train_matrix = self.train_df.loc[rows, train_columns].to_numpy(dtype=np.float64)
+            ideal_matrix = self.ideal_df.loc[rows, ideal_columns].to_numpy(dtype=np.float64)
+
+            if self.workers > 1:
+                deviations = parallel_sum_squared_deviations(train_matrix, ideal_matrix, self.workers)
+            else:
+                deviations = DeviationEngine(ideal_matrix).sum_squared_deviations(train_matrix)
+
+            self.deviation_df = pd.DataFrame({
+                'Train Function': categorical(train_columns, np.repeat(np.arange(len(train_columns)), len(ideal_columns))),
+                'Ideal Function': categorical(ideal_columns, np.tile(np.arange(len(ideal_columns)), len(train_columns))),
+                'Deviation': deviations.ravel()
+            })
 
         except KeyError as e:
             print(f"Error: {e}")
@@ -55,17 +68,30 @@ class FunctionSelector(BaseFunctionSelector):
             DataFrame: DataFrame containing the best ideal functions for each training function.
         """
         try:
-            self.deviation_df = self.deviation_df.sort_values(by='Deviation')
-            best_ideal_functions = self.deviation_df.groupby('Train Function').first().reset_index()
+            # A stable sort keeps ties in train/ideal column order, so the first ideal column wins
+            self.deviation_df = self.deviation_df.sort_values(by='Deviation', kind='stable')
+            best_ideal_functions = self.deviation_df.groupby('Train Function', observed=True).first().reset_index()
+            # One row per training function is small, so the names are kept as plain strings
+            for column in ('Train Function', 'Ideal Function'):
+                if isinstance(best_ideal_functions[column].dtype, pd.CategoricalDtype):
+                    best_ideal_functions[column] = best_ideal_functions[column].astype(str)
             print("Best ideal functions DataFrame:\n", best_ideal_functions)
 
             # Validate if the selected ideal functions exist in both DataFrame columns
-            valid_ideal_functions = best_ideal_functions[
-                best_ideal_functions['Ideal Function'].isin(self.ideal_df.columns)
-            ]
+            valid_ideal_functions = best_ideal_functions
+            if self.ideal_df is not None:
+                valid_ideal_functions = valid_ideal_functions[
+                    valid_ideal_functions['Ideal Function'].isin(self.ideal_df.columns)
+                ]
             valid_ideal_functions = valid_ideal_functions[
                 valid_ideal_functions['Train Function'].isin(self.train_df.columns)
             ]
+            if 'Max Deviation' not in valid_ideal_functions.columns:
+                valid_ideal_functions = valid_ideal_functions.assign(**{
+                    'Max Deviation': self.max_deviations(
+                        valid_ideal_functions['Train Function'], valid_ideal_functions['Ideal Function']
+                    )
+                })
             self.best_ideal_functions = valid_ideal_functions
 
             print("Selected ideal functions:")
@@ -78,3 +104,176 @@ class FunctionSelector(BaseFunctionSelector):
         except Exception as e:
             print(f"An unexpected error occurred: {e}")
             raise
+
+    def select_top_k(self, k=1, metric='sse', row_block=64, column_block=256):
+        """
+        Select the k best ideal functions per training function under a deviation metric.
+
+        Unlike select_ideal_functions, this does not need calculate_deviations first.
+        Candidates are scored in blocks of ideal columns and rows. A candidate is dropped
+        as soon as its partial error reaches the current k-th best, so clearly bad
+        candidates are never accumulated over all rows. The column blocks start at k
+        columns and double up to column_block, and the k-th best is tightened after
+        every block, so pruning starts right after the first k candidates.
+
+        Args:
+            k (int): Number of candidates per training function.
+            metric (str or DeviationMetric): 'sse', 'max_abs', 'mae' or a custom metric.
+            row_block (int): Number of rows accumulated between pruning steps.
+            column_block (int): Largest number of ideal columns scored together.
+
+        Returns:
+            DataFrame: 'Train Function', 'Ideal Function', 'Deviation' (the metric value),
+                'Rank' and 'Max Deviation', best candidates first.
+        """
+        if k < 1 or row_block < 1 or column_block < 1:
+            raise ValueError("k, row_block and column_block must be at least 1")
+        metric = get_metric(metric)
+        try:
+            train_columns = self.train_df.columns.drop('x')
+            ideal_columns = self.ideal_df.columns.drop('x')
+            rows = range(len(self.train_df))
+            train_matrix = self.train_df.loc[rows, train_columns].to_numpy(dtype=np.float64)
+            ideal_matrix = self.ideal_df.loc[rows, ideal_columns].to_numpy(dtype=np.float64)
+            n_rows = len(train_matrix)
+
+            results = []
+            evaluated = 0
+            for train_pos, train_col in enumerate(train_columns):
+                best_values = np.empty(0)
+                best_positions = np.empty(0, dtype=np.intp)
+                start, size = 0, min(k, column_block)
+                while start < len(ideal_columns):
+                    alive = np.arange(start, min(start + size, len(ideal_columns)))
+                    start += size
+                    # Small blocks first make the k-th best known early, larger ones keep the work vectorised
+                    size = min(2 * size, column_block)
+                    acc = np.zeros(len(alive))
+                    threshold = best_values[-1] if len(best_values) == k else np.inf
+                    for row_start in range(0, n_rows, row_block):
+                        diff = (train_matrix[row_start:row_start + row_block, train_pos, None]
+                                - ideal_matrix[row_start:row_start + row_block, alive])
+                        acc = metric.accumulate(acc, diff)
+                        evaluated += diff.size
+                        # Later columns lose ties, so a candidate that reaches the k-th best is out
+                        keep = metric.finalize(acc, n_rows) < threshold
+                        alive, acc = alive[keep], acc[keep]
+                        if not len(alive):
+                            break
+
+                    values = np.concatenate([best_values, metric.finalize(acc, n_rows)])
+                    positions = np.concatenate([best_positions, alive])
+                    order = np.lexsort((positions, values))[:k]
+                    best_values, best_positions = values[order], positions[order]
+
+                for rank, (value, position) in enumerate(zip(best_values, best_positions), start=1):
+                    results.append((train_col, ideal_columns[position], value, rank))
+
+            top_k_functions = pd.DataFrame(results, columns=['Train Function', 'Ideal Function', 'Deviation', 'Rank'])
+            top_k_functions['Max Deviation'] = self.max_deviations(top_k_functions['Train Function'],
+                                                                   top_k_functions['Ideal Function'])
+            total = n_rows * len(train_columns) * len(ideal_columns)
+            self.pruning_stats = {'evaluated': evaluated, 'total': total,
+                                  'skipped_fraction': 1 - evaluated / total if total else 0.0}
+            self.top_k_functions = top_k_functions
+            return top_k_functions
+        except KeyError as e:
+            print(f"Error: {e}")
+            raise
+        except Exception as e:
+            print(f"An unexpected error occurred: {e}")
+            raise
+
+    def max_deviations(self, train_functions, ideal_functions):
+        """
+        Calculate the largest absolute deviation for each (train, ideal) function pair.
+
+        TestMapper uses these values as the mapping thresholds, so they are computed once
+        per selected pair instead of once per test point.
+
+        Args:
+            train_functions (list): Training function names.
+            ideal_functions (list): Ideal function names, paired with train_functions.
+
+        Returns:
+            ndarray: The maximum absolute deviation of each pair.
+        """
+        rows = range(len(self.train_df))
+        train_matrix = self.train_df.loc[rows, list(train_functions)].to_numpy(dtype=np.float64)
+        ideal_matrix = self.ideal_df.loc[rows, list(ideal_functions)].to_numpy(dtype=np.float64)
+        return np.abs(train_matrix - ideal_matrix).max(axis=0, initial=0.0)
+
+class StreamingFunctionSelector(FunctionSelector):
+    """
+    StreamingFunctionSelector class for selecting ideal functions from a catalogue read in blocks.
+
+    Deviations are computed one block of ideal columns at a time and only the top-k
+    candidates per training function are kept in a heap, so peak memory is bounded by
+    the block size rather than the size of the catalogue.
+
+    Attributes:
+        ideal_blocks (iterable): DataFrames holding 'x' and a block of ideal functions,
+            e.g. from DataHandler.iter_ideal_blocks.
+        top_k (int): Number of candidates kept per training function.
+        top_candidates (dict): Training function mapped to its (Ideal Function, Deviation,
+            Max Deviation) candidates, best first.
+    """
+    def __init__(self, train_df, ideal_blocks, top_k=1):
+        super().__init__(train_df, None)
+        if top_k < 1:
+            raise ValueError("top_k must be at least 1")
+        self.ideal_blocks = ideal_blocks
+        self.top_k = top_k
+        self.top_candidates = {}
+
+    def calculate_deviations(self):
+        """
+        Calculate the deviations block by block, keeping the top-k candidates per training function.
+        """
+        print("Calculating deviations...")
+        try:
+            train_columns = self.train_df.columns.drop('x')
+            rows = range(len(self.train_df))
+            train_matrix = self.train_df.loc[rows, train_columns].to_numpy(dtype=np.float64)
+
+            # Max-heaps of (-deviation, -order, ideal function): the root is the worst kept candidate
+            heaps = [[] for _ in train_columns]
+            order = 0
+            for block in self.ideal_blocks:
+                ideal_columns = block.columns.drop('x')
+                ideal_matrix = block.loc[rows, ideal_columns].to_numpy(dtype=np.float64)
+                deviations = DeviationEngine(ideal_matrix).sum_squared_deviations(train_matrix)
+
+                # Only the block's own top-k per training function can enter the heaps
+                block_best = np.argsort(deviations, axis=1, kind='stable')[:, :self.top_k]
+                for train_pos, heap in enumerate(heaps):
+                    for ideal_pos in block_best[train_pos]:
+                        entry = (-deviations[train_pos, ideal_pos], -(order + ideal_pos))
+                        if len(heap) == self.top_k and entry <= heap[0][:2]:
+                            continue
+                        max_deviation = np.abs(train_matrix[:, train_pos] - ideal_matrix[:, ideal_pos]).max(initial=0.0)
+                        entry += (ideal_columns[ideal_pos], max_deviation)
+                        if len(heap) < self.top_k:
+                            heapq.heappush(heap, entry)
+                        else:
+                            heapq.heapreplace(heap, entry)
+                order += len(ideal_columns)
+
+            self.top_candidates = {
+                train_col: [(ideal_col, -neg_dev, max_deviation)
+                            for neg_dev, _, ideal_col, max_deviation in sorted(heap, reverse=True)]
+                for train_col, heap in zip(train_columns, heaps)
+            }
+            self.deviation_df = pd.DataFrame(
+                [(train_col,) + candidate
+                 for train_col, candidates in self.top_candidates.items()
+                 for candidate in candidates],
+                columns=['Train Function', 'Ideal Function', 'Deviation', 'Max Deviation']
+            )
+
+        except KeyError as e:
+            print(f"Error: {e}")
+            raise
+        except Exception as e:
+            print(f"An unexpected error occurred: {e}")
+            raise
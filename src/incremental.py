@@ -0,0 +1,197 @@
+import numpy as np
+import pandas as pd
+from src.data_handler import bulk_load, content_fingerprint, write_table
+from src.test_mapper import IdealIndex
+
+class IncrementalDeviationTracker:
+    """
+    IncrementalDeviationTracker class for keeping the selection up to date as training rows arrive.
+
+    For every (train, ideal) pair the tracker keeps a running sum of squared deviations
+    and the largest absolute deviation, which TestMapper uses as the threshold. A batch
+    of new training rows is aligned to the ideal functions by x and only adds its own
+    rows to the accumulators, so an update costs O(new rows x pairs) regardless of the
+    history.
+
+    The selection itself is only re-evaluated where the ranking could have changed. For
+    every training function the tracker keeps a lower bound on the margin between the
+    best candidate and the runner-up. Accumulators only grow, so when the best
+    candidate's increase stays below that margin no other candidate can have overtaken it.
+
+    Attributes:
+        ideal_columns (Index): Names of the ideal functions.
+        train_columns (Index): Names of the training functions, set by the first update.
+        sse (ndarray): Sums of squared deviations of shape (train functions, ideal functions).
+        max_abs (ndarray): Largest absolute deviations, same shape as sse.
+        n_rows (int): Number of training rows accumulated so far.
+        stats (dict): Number of updates, and of training functions whose selection was
+            re-evaluated or kept by the margin test.
+    """
+    def __init__(self, ideal_df, x_policy='reject'):
+        self.ideal_columns = ideal_df.columns.drop('x')
+        self.index = IdealIndex(ideal_df, x_policy)
+        self.train_columns = None
+        self.sse = None
+        self.max_abs = None
+        self.n_rows = 0
+        self._ideal_fingerprint = None
+        self.stats = {'updates': 0, 'reevaluated': 0, 'kept': 0}
+
+    def _reset(self, train_columns):
+        self.train_columns = pd.Index(train_columns)
+        shape = (len(self.train_columns), len(self.ideal_columns))
+        self.sse = np.zeros(shape)
+        self.max_abs = np.zeros(shape)
+        self._best = np.zeros(shape[0], dtype=np.intp)
+        # A zero margin makes the first update select every training function
+        self._margin = np.zeros(shape[0])
+
+    def update(self, delta_train_df):
+        """
+        Add new training rows to the accumulators and update the selection.
+
+        Args:
+            delta_train_df (DataFrame): New rows with 'x' and the training functions.
+
+        Returns:
+            DataFrame: The current best ideal functions, like best_ideal_functions.
+        """
+        try:
+            train_columns = delta_train_df.columns.drop('x')
+            if self.train_columns is None:
+                self._reset(train_columns)
+            elif set(train_columns) != set(self.train_columns):
+                raise KeyError(f"Expected the training functions {list(self.train_columns)}")
+
+            ideal_values, resolved = self.index.lookup(delta_train_df['x'].to_numpy(dtype=np.float64),
+                                                       self.ideal_columns)
+            if not resolved.all():
+                raise ValueError(f"{int((~resolved).sum())} training rows have x values missing from the ideal data")
+            train_matrix = delta_train_df[self.train_columns].to_numpy(dtype=np.float64)
+
+            previous_best = self.sse[np.arange(len(self._best)), self._best]
+            for train_pos in range(len(self.train_columns)):
+                diff = ideal_values - train_matrix[:, train_pos, None]
+                self.sse[train_pos] += np.einsum('ij,ij->j', diff, diff)
+                np.maximum(self.max_abs[train_pos], np.abs(diff).max(axis=0, initial=0.0), out=self.max_abs[train_pos])
+            self.n_rows += len(delta_train_df)
+
+            # The runner-up grew by at least zero, so the margin shrinks by at most the best's increase
+            increase = self.sse[np.arange(len(self._best)), self._best] - previous_best
+            self._margin -= increase
+            # A tie goes to the earlier column, so only a strictly positive margin keeps the best
+            stale = np.nonzero(self._margin <= 0)[0]
+            self._reevaluate(stale)
+            self.stats['updates'] += 1
+            self.stats['reevaluated'] += len(stale)
+            self.stats['kept'] += len(self._best) - len(stale)
+            return self.best_ideal_functions
+
+        except KeyError as e:
+            print(f"Error: {e}")
+            raise
+        except Exception as e:
+            print(f"An unexpected error occurred: {e}")
+            raise
+
+    def _reevaluate(self, train_positions):
+        """
+        Select the best ideal function and the exact margin to the runner-up for some training functions.
+        """
+        if not len(train_positions) or not len(self.ideal_columns):
+            return
+        sse = self.sse[train_positions]
+        best = sse.argmin(axis=1)
+        self._best[train_positions] = best
+        if sse.shape[1] < 2:
+            self._margin[train_positions] = np.inf
+            return
+        runner_up = np.partition(sse, 1, axis=1)[:, 1]
+        self._margin[train_positions] = runner_up - sse[np.arange(len(best)), best]
+
+    @property
+    def best_ideal_functions(self):
+        """
+        The best ideal function per training function.
+
+        Returns:
+            DataFrame: 'Train Function', 'Ideal Function', 'Deviation' and 'Max Deviation',
+                like FunctionSelector.select_ideal_functions, ready for TestMapper.
+        """
+        if self.train_columns is None:
+            return pd.DataFrame(columns=['Train Function', 'Ideal Function', 'Deviation', 'Max Deviation'])
+        train_positions = np.arange(len(self.train_columns))
+        best_ideal_functions = pd.DataFrame({
+            'Train Function': self.train_columns.to_numpy(dtype=str),
+            'Ideal Function': self.ideal_columns.to_numpy(dtype=str)[self._best],
+            'Deviation': self.sse[train_positions, self._best],
+            'Max Deviation': self.max_abs[train_positions, self._best]
+        })
+        return best_ideal_functions.sort_values('Train Function', kind='stable').reset_index(drop=True)
+
+    def save(self, engine, table='deviation_accumulators'):
+        """
+        Persist the accumulators to an SQLite table, one row per (train, ideal) pair.
+
+        The number of rows and the content hash of the ideal functions, see
+        content_fingerprint, are written to the one-row table '<table>_state'.
+
+        Args:
+            engine (Engine): SQLAlchemy engine of the SQLite database.
+            table (str): Name of the table to replace.
+        """
+        if self.train_columns is None:
+            raise RuntimeError("There are no accumulators to save before the first update")
+        n_train, n_ideal = self.sse.shape
+        accumulators = pd.DataFrame({
+            'Train Function': np.repeat(self.train_columns.to_numpy(dtype=object), n_ideal),
+            'Ideal Function': np.tile(self.ideal_columns.to_numpy(dtype=object), n_train),
+            'SSE': self.sse.ravel(),
+            'Max Abs': self.max_abs.ravel()
+        })
+        state = pd.DataFrame({'Ideal Fingerprint': [self.ideal_fingerprint], 'Rows': [self.n_rows]})
+        with bulk_load(engine) as cursor:
+            write_table(cursor, table, accumulators)
+            write_table(cursor, f'{table}_state', state)
+
+    @property
+    def ideal_fingerprint(self):
+        """
+        Content hash of the ideal functions the accumulators are built against.
+        """
+        if self._ideal_fingerprint is None:
+            self._ideal_fingerprint = content_fingerprint(self.index.ideal_df)
+        return self._ideal_fingerprint
+
+    @classmethod
+    def load(cls, engine, ideal_df, table='deviation_accumulators', x_policy='reject'):
+        """
+        Restore a tracker from accumulators written by save.
+
+        Args:
+            engine (Engine): SQLAlchemy engine of the SQLite database.
+            ideal_df (DataFrame): The ideal functions the accumulators were built against.
+                Their names, x grid and values must match the stored fingerprint.
+            table (str): Name of the accumulators table.
+
+        Returns:
+            IncrementalDeviationTracker: Tracker that continues from the stored state.
+        """
+        tracker = cls(ideal_df, x_policy)
+        accumulators = pd.read_sql(f'SELECT * FROM "{table}" ORDER BY rowid', engine)
+        if accumulators.empty:
+            return tracker
+        if set(accumulators['Ideal Function']) != set(tracker.ideal_columns):
+            raise KeyError("The ideal_df columns differ from the ideal functions of the stored accumulators")
+        state = pd.read_sql(f'SELECT * FROM "{table}_state"', engine)
+        if state['Ideal Fingerprint'].iloc[0] != tracker.ideal_fingerprint:
+            raise ValueError("The ideal_df values or x grid differ from the ideal functions of the stored accumulators")
+        train_columns = pd.unique(accumulators['Train Function'])
+        tracker._reset(train_columns)
+        rows = tracker.train_columns.get_indexer(accumulators['Train Function'])
+        columns = tracker.ideal_columns.get_indexer(accumulators['Ideal Function'])
+        tracker.sse[rows, columns] = accumulators['SSE'].to_numpy(dtype=np.float64)
+        tracker.max_abs[rows, columns] = accumulators['Max Abs'].to_numpy(dtype=np.float64)
+        tracker.n_rows = int(state['Rows'].iloc[0])
+        tracker._reevaluate(np.arange(len(train_columns)))
+        return tracker
@@ -0,0 +1,103 @@
+import json
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+def peak_rss_bytes():
+    """
+    Get the peak resident set size of this process.
+
+    Returns:
+        int: Peak RSS in bytes, or None where the platform does not report it.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+class StageProfiler:
+    """
+    StageProfiler class for recording the cost of each pipeline stage.
+
+    Each stage records its wall and CPU time and its effect on the memory high-water
+    mark, plus any details the stage fills in itself, such as rows processed and bytes read or
+    written. Every finished record is passed to the registered hooks, so callers can
+    forward them to logs or metrics systems.
+
+    The operating system only reports the peak RSS over the whole process lifetime, so
+    'process_peak_rss_bytes' is the running peak at the end of the stage and repeats
+    earlier values once a bigger stage has run. 'peak_rss_delta_bytes' is how far the
+    stage itself raised that peak, zero if it stayed below an earlier stage's peak.
+
+    Attributes:
+        records (list): One dict per finished stage, in order.
+        hooks (list): Callables receiving each finished stage record.
+    """
+    def __init__(self, hooks=None):
+        self.records = []
+        self.hooks = list(hooks or [])
+
+    def add_hook(self, hook):
+        """
+        Register a callable that receives each finished stage record.
+        """
+        self.hooks.append(hook)
+
+    @contextmanager
+    def stage(self, name, **details):
+        """
+        Measure a stage of the pipeline.
+
+        Args:
+            name (str): Name of the stage, e.g. 'load' or 'map'.
+            **details: Initial values for extra fields of the record.
+
+        Yields:
+            dict: The stage record, e.g. to set 'rows', 'bytes_read' or 'bytes_written'.
+        """
+        record = {'stage': name, **details}
+        peak_start = peak_rss_bytes()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield record
+        finally:
+            record['wall_seconds'] = time.perf_counter() - wall_start
+            record['cpu_seconds'] = time.process_time() - cpu_start
+            peak_end = peak_rss_bytes()
+            record['process_peak_rss_bytes'] = peak_end
+            record['peak_rss_delta_bytes'] = None if peak_end is None else peak_end - peak_start
+            self.records.append(record)
+            for hook in self.hooks:
+                hook(record)
+
+    def report(self):
+        """
+        Summarise the recorded stages.
+
+        Returns:
+            dict: The stage records, the total wall and CPU time and the peak RSS of the process.
+        """
+        return {
+            'stages': self.records,
+            'total_wall_seconds': sum(record['wall_seconds'] for record in self.records),
+            'total_cpu_seconds': sum(record['cpu_seconds'] for record in self.records),
+            'peak_rss_bytes': peak_rss_bytes()
+        }
+
+    def write_report(self, path):
+        """
+        Write the report as JSON.
+
+        Args:
+            path (str): Path of the file to write.
+        """
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+            f.write('\n')
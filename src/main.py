@@ -1,59 +1,194 @@
+import argparse
+import cProfile
 import sys
 import os
 
-# Add the parent directory to the PYTHONPATH
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+if __name__ == "__main__" and not __package__:
+    # Run as a script: add the parent directory to the PYTHONPATH
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from src.data_handler import DataHandler
+from src.data_handler import TABLES, DataHandler
 from src.function_selector import FunctionSelector
+from src.instrumentation import StageProfiler
+from src.result_cache import ResultCache, file_fingerprint
 from src.test_mapper import TestMapper
-from src.visualizer import Visualizer
 
 class Main:
     """
     Main class to orchestrate the data loading, processing, and visualization tasks.
+
+    Attributes:
+        workers (int or None): Number of processes for the deviation search.
+        cache (ResultCache): Result cache keyed by input content hashes, or None to
+            recompute every stage on each run.
+        profiler (StageProfiler): Records the time, rows, bytes and peak RSS growth of the load,
+            save, select, map and visualize stages.
+        output_dir (str): Directory the plots are exported to instead of being shown, or
+            None to open them in a browser.
+        output_format (str): Format of the exported plots, 'html', 'json' or 'png'.
     """
-    def __init__(self, train_path, ideal_path, test_path):
-        self.data_handler = DataHandler(train_path, ideal_path, test_path)
+    def __init__(self, train_path, ideal_path, test_path, workers=1, cache=False, db_path='sqlite:///data.db',
+                 profiler=None, output_dir=None, output_format='html'):
+        self.data_handler = DataHandler(train_path, ideal_path, test_path, db_path)
+        self.workers = workers
+        self.cache = ResultCache(self.data_handler.engine) if cache else None
+        self.profiler = profiler if profiler is not None else StageProfiler()
+        self.output_dir = output_dir
+        self.output_format = output_format
 
     def run(self):
         """
         Run the main process: load data, calculate deviations, select ideal functions,
         map test data, and visualize results.
+
+        With the cache enabled, every input whose content did not change is read back from
+        the database instead of its CSV file and is not rewritten, the selection is reused
+        when the train and ideal data are unchanged, and only test points that were never
+        mapped are passed to the TestMapper.
         """
         try:
             # Load and save data
-            self.data_handler.load_data()
-            self.data_handler.save_to_db()
+            with self.profiler.stage('load') as record:
+                hashes = None
+                input_paths = dict(zip(TABLES, (self.data_handler.train_path, self.data_handler.ideal_path,
+                                                self.data_handler.test_path)))
+                changed = list(TABLES)
+                if self.cache is not None:
+                    hashes = {table: file_fingerprint(path) for table, path in input_paths.items()}
+                    stored = self.cache.stored_input_hashes()
+                    changed = [table for table in TABLES if stored.get(table) != hashes[table]]
+                unchanged = [table for table in TABLES if table not in changed]
+                if unchanged:
+                    print(f"Inputs unchanged, loading {', '.join(unchanged)} from the database.")
+                    self.data_handler.load_from_db(tables=unchanged)
+                if changed:
+                    self.data_handler.load_data(tables=changed)
+                record['bytes_read'] = (sum(os.path.getsize(input_paths[table]) for table in changed)
+                                        + (self._db_size() if unchanged else 0))
+                record['source'] = {table: 'csv' if table in changed else 'db' for table in TABLES}
 
-            # Get data
-            train_df = self.data_handler.get_train_data()
-            ideal_df = self.data_handler.get_ideal_data()
+                # Get data
+                train_df = self.data_handler.get_train_data()
+                ideal_df = self.data_handler.get_ideal_data()
+                test_df = self.data_handler.get_test_data()
+                record['rows'] = len(train_df) + len(ideal_df) + len(test_df)
+
+            # Only the tables whose input changed are rewritten
+            if changed:
+                with self.profiler.stage('save') as record:
+                    size_before = self._db_size()
+                    self.data_handler.save_to_db(tables=changed)
+                    if hashes is not None:
+                        self.cache.record_input_hashes(hashes)
+                    record['tables'] = changed
+                    record['rows'] = sum(len(getattr(self.data_handler, f'{table}_df')) for table in changed)
+                    record['bytes_written'] = max(self._db_size() - size_before, 0)
 
             # Calculate deviations and select ideal functions
-            selector = FunctionSelector(train_df, ideal_df)
-            selector.calculate_deviations()
-            best_ideal_functions = selector.select_ideal_functions()
+            with self.profiler.stage('select') as record:
+                if self.cache is None:
+                    selector = FunctionSelector(train_df, ideal_df, workers=self.workers)
+                    selector.calculate_deviations()
+                    best_ideal_functions = selector.select_ideal_functions()
+                else:
+                    key = ResultCache.selection_key(hashes['train'], hashes['ideal'])
+                    best_ideal_functions = self._cached_selection(key, train_df, ideal_df)
+                record['rows'] = len(train_df)
+                record['pairs'] = (len(train_df.columns) - 1) * (len(ideal_df.columns) - 1)
 
             # Map test data to ideal functions
-            test_df = self.data_handler.get_test_data()
-            mapper = TestMapper(test_df, ideal_df, train_df, best_ideal_functions)
-            test_results_df = mapper.map_test_data()
+            with self.profiler.stage('map') as record:
+                if self.cache is None:
+                    mapper = TestMapper(test_df, ideal_df, train_df, best_ideal_functions)
+                    test_results_df = mapper.map_test_data()
+                else:
+                    test_results_df = self._cached_mapping(key, test_df, ideal_df, train_df, best_ideal_functions)
+                record['rows'] = len(test_df)
+                record['matched'] = len(test_results_df)
 
             # Visualize results
-            visualizer = Visualizer(train_df, ideal_df, test_results_df)
-            visualizer.visualize()
+            with self.profiler.stage('visualize') as record:
+                # Bokeh is only imported once there is something to plot
+                from src.visualizer import Visualizer
+                visualizer = Visualizer.for_data(train_df, ideal_df, test_results_df)
+                if self.output_dir is None:
+                    visualizer.visualize()
+                else:
+                    paths = visualizer.export(self.output_dir, self.output_format, workers=self.workers or 1)
+                    record['files'] = len(paths)
+                record['rows'] = len(test_results_df)
         
         except Exception as e:
             print(f"An error occurred during the main process: {e}")
             raise
 
+    def _db_size(self):
+        """
+        Get the size of the SQLite database file including its write-ahead log.
+        """
+        database = self.data_handler.engine.url.database
+        if not database:
+            return 0
+        return sum(os.path.getsize(path) for path in (database, database + '-wal') if os.path.exists(path))
+
+    def _cached_selection(self, key, train_df, ideal_df):
+        """
+        Get the best ideal functions from the cache, selecting and storing them on a miss.
+        """
+        cached = self.cache.load_selection(key)
+        if cached is not None:
+            print("Train and ideal data unchanged, reusing the cached selection.")
+            return cached[1]
+        selector = FunctionSelector(train_df, ideal_df, workers=self.workers)
+        selector.calculate_deviations()
+        best_ideal_functions = selector.select_ideal_functions()
+        self.cache.store_selection(key, selector.deviation_df, best_ideal_functions)
+        return best_ideal_functions
+
+    def _cached_mapping(self, key, test_df, ideal_df, train_df, best_ideal_functions):
+        """
+        Map only the test points missing from the cache and return the results for all of them.
+        """
+        test_results_df, new_points = self.cache.load_test_results(key, test_df)
+        if new_points.empty:
+            print("No new test points, reusing the cached test results.")
+            return test_results_df
+        print(f"Mapping {len(new_points)} new test points...")
+        mapper = TestMapper(new_points, ideal_df, train_df, best_ideal_functions)
+        self.cache.store_test_results(key, new_points, mapper.map_test_data())
+        return self.cache.load_test_results(key, test_df)[0]
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Select ideal functions and map the test data to them.")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Number of processes for the deviation search (default: 1)")
+    parser.add_argument('--cache', action='store_true',
+                        help="Reuse stored results for inputs whose content has not changed")
+    parser.add_argument('--profile', metavar='REPORT',
+                        help="Write per-stage timings, rows, bytes and peak RSS growth to this JSON file")
+    parser.add_argument('--cprofile', metavar='DUMP', help="Write a cProfile dump of the run to this file")
+    parser.add_argument('--output-dir', metavar='DIR',
+                        help="Export one plot file per ideal function to this directory instead of showing them")
+    parser.add_argument('--format', choices=('html', 'json', 'png'), default='html',
+                        help="Format of the exported plots (default: html)")
+    args = parser.parse_args()
+
     # Determine absolute paths based on the location of this script
     base_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
     train_path = os.path.join(base_path, 'data/train.csv')
     ideal_path = os.path.join(base_path, 'data/ideal.csv')
     test_path = os.path.join(base_path, 'data/test.csv')
 
-    main = Main(train_path, ideal_path, test_path)
-    main.run()
+    main = Main(train_path, ideal_path, test_path, workers=args.workers, cache=args.cache,
+                output_dir=args.output_dir, output_format=args.format)
+    profile = cProfile.Profile() if args.cprofile else None
+    try:
+        if profile is not None:
+            profile.runcall(main.run)
+        else:
+            main.run()
+    finally:
+        if profile is not None:
+            profile.dump_stats(args.cprofile)
+        if args.profile:
+            main.profiler.write_report(args.profile)
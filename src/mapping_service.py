@@ -0,0 +1,206 @@
+import argparse
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+if __name__ == "__main__" and not __package__:
+    # Run as a script: add the parent directory to the PYTHONPATH
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from src.data_handler import DataHandler
+from src.function_selector import FunctionSelector
+from src.test_mapper import TestMapper
+
+class MappingModel:
+    """
+    MappingModel class holding a warm, ready-to-map selection of ideal functions.
+
+    The ideal functions are selected once and the TestMapper is prepared once, so each
+    mapping request only runs the lookup and the deviation check. A reload builds a new
+    mapper next to the current one and swaps it in, so requests keep being answered
+    while the new data is selected.
+
+    Attributes:
+        data_handler (DataHandler): Source of the train and ideal data.
+        source (str): 'db' to load the data from the SQLite database, 'csv' to load it
+            from the CSV files.
+        workers (int or None): Number of processes for the deviation search.
+        x_policy (str): x policy passed to the TestMapper.
+        match_policy (str): Match policy passed to the TestMapper.
+    """
+    def __init__(self, data_handler, source='db', workers=1, x_policy='reject', match_policy='first'):
+        if source not in ('db', 'csv'):
+            raise ValueError(f"Unknown source '{source}', expected 'db' or 'csv'")
+        self.data_handler = data_handler
+        self.source = source
+        self.workers = workers
+        self.x_policy = x_policy
+        self.match_policy = match_policy
+        self.mapper = None
+        self._reload_lock = threading.Lock()
+
+    def load(self):
+        """
+        Load the data, select the ideal functions and prepare a new mapper.
+
+        Returns:
+            DataFrame: The newly selected ideal functions.
+        """
+        with self._reload_lock:
+            if self.source == 'db':
+                self.data_handler.load_from_db()
+            else:
+                self.data_handler.load_data()
+            train_df = self.data_handler.get_train_data()
+            ideal_df = self.data_handler.get_ideal_data()
+
+            selector = FunctionSelector(train_df, ideal_df, workers=self.workers)
+            selector.calculate_deviations()
+            best_ideal_functions = selector.select_ideal_functions()
+
+            mapper = TestMapper(None, ideal_df, train_df, best_ideal_functions,
+                                x_policy=self.x_policy, match_policy=self.match_policy)
+            mapper.prepare()
+            self.mapper = mapper
+            return best_ideal_functions
+
+    def map_points(self, x_values, y_values):
+        """
+        Map a batch of points with the current mapper.
+
+        Returns:
+            list: One dict per input point with its mapping, or None if it is unmatched.
+        """
+        mapper = self.mapper
+        if mapper is None:
+            raise RuntimeError("The model is not loaded")
+        x_values = np.asarray(x_values, dtype=np.float64)
+        y_values = np.asarray(y_values, dtype=np.float64)
+        # The raw kernel avoids building a DataFrame for a handful of points
+        matched, chosen, deltas = mapper.match_arrays(x_values, y_values)
+        ideal_names, train_names = mapper.ideal_names, mapper.train_names
+        x_list, y_list = x_values.tolist(), y_values.tolist()
+        mapped = [None] * len(x_list)
+        for position, function, delta in zip(matched.tolist(), chosen.tolist(), deltas.tolist()):
+            mapped[position] = {'x': x_list[position], 'y': y_list[position], 'Delta y': delta,
+                                'Ideal Function': ideal_names[function], 'Train Function': train_names[function]}
+        return mapped
+
+    def functions(self):
+        """
+        Get the currently selected function pairs.
+
+        Returns:
+            list: One dict per selected (train, ideal) function pair.
+        """
+        mapper = self.mapper
+        if mapper is None:
+            return []
+        return mapper.best_ideal_functions.to_dict('records')
+
+class MappingRequestHandler(BaseHTTPRequestHandler):
+    """
+    MappingRequestHandler class for the JSON endpoints of the mapping service.
+
+    Endpoints:
+        GET /health: Service status and the selected functions.
+        POST /map: Map a single point given as {"x": ..., "y": ...}.
+        POST /map/batch: Map {"points": [[x, y], ...]}, answered in input order.
+        POST /reload: Reload the data and reselect the ideal functions.
+    """
+    server_version = 'MappingService/1.0'
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send(200, {'status': 'ok', 'functions': self.server.model.functions()})
+        else:
+            self._send(404, {'error': f"Unknown endpoint {self.path}"})
+
+    def do_POST(self):
+        try:
+            body = self._read_json()
+            if self.path == '/map':
+                result = self.server.model.map_points([float(body['x'])], [float(body['y'])])[0]
+                self._send(200, {'result': result})
+            elif self.path == '/map/batch':
+                points = np.asarray(body['points'], dtype=np.float64)
+                if points.size == 0:
+                    points = points.reshape(0, 2)
+                if points.ndim != 2 or points.shape[1] != 2:
+                    raise ValueError("'points' must be a list of [x, y] pairs")
+                results = self.server.model.map_points(points[:, 0], points[:, 1])
+                self._send(200, {'results': results})
+            elif self.path == '/reload':
+                self.server.model.load()
+                self._send(200, {'status': 'reloaded', 'functions': self.server.model.functions()})
+            else:
+                self._send(404, {'error': f"Unknown endpoint {self.path}"})
+        except (KeyError, ValueError, TypeError) as e:
+            self._send(400, {'error': f"Invalid request: {e}"})
+        except Exception as e:
+            print(f"An unexpected error occurred: {e}")
+            self._send(500, {'error': str(e)})
+
+    def log_message(self, format, *args):
+        # Per-request logging to stderr would dominate the latency under load
+        pass
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length', 0))
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, default=_to_json).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class MappingServer(ThreadingHTTPServer):
+    """
+    MappingServer class serving a MappingModel over HTTP.
+
+    Attributes:
+        model (MappingModel): The loaded model answering the requests.
+    """
+    daemon_threads = True
+
+    def __init__(self, address, model):
+        super().__init__(address, MappingRequestHandler)
+        self.model = model
+
+def _to_json(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve test point mappings from a warm model.")
+    parser.add_argument('--host', default='127.0.0.1', help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8080, help="Port to listen on (default: 8080)")
+    parser.add_argument('--source', choices=('db', 'csv'), default='db',
+                        help="Load the data from the SQLite database or the CSV files (default: db)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Number of processes for the deviation search (default: 1)")
+    args = parser.parse_args()
+
+    # Determine absolute paths based on the location of this script
+    base_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    data_handler = DataHandler(os.path.join(base_path, 'data/train.csv'),
+                               os.path.join(base_path, 'data/ideal.csv'),
+                               os.path.join(base_path, 'data/test.csv'))
+
+    model = MappingModel(data_handler, source=args.source, workers=args.workers)
+    model.load()
+    server = MappingServer((args.host, args.port), model)
+    print(f"Serving mappings on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
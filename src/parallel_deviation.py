@@ -0,0 +1,98 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from src.deviation_engine import DeviationEngine
+
+def resolve_workers(workers):
+    """
+    Resolve a workers setting to a process count.
+
+    Args:
+        workers (int or None): Requested number of processes, None for one per CPU.
+
+    Returns:
+        int: The number of processes to use.
+    """
+    if workers is None:
+        return os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+    return workers
+
+def _shared_arrays(buffer, n_rows, n_ideal):
+    """
+    Get views on the centred ideal matrix, its column norms and the centre in a shared buffer.
+    """
+    ideal_centred = np.ndarray((n_rows, n_ideal), dtype=np.float64, buffer=buffer, order='F')
+    ideal_sq_norms = np.ndarray((n_ideal,), dtype=np.float64, buffer=buffer, offset=8 * n_rows * n_ideal)
+    centre = np.ndarray((n_rows, 1), dtype=np.float64, buffer=buffer, offset=8 * (n_rows + 1) * n_ideal)
+    return ideal_centred, ideal_sq_norms, centre
+
+def _deviation_block(shm_name, n_rows, n_ideal, train_matrix, start, stop):
+    """
+    Compute the deviations against ideal columns [start, stop) of the shared ideal matrix.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        ideal_centred, ideal_sq_norms, centre = _shared_arrays(shm.buf, n_rows, n_ideal)
+        engine = DeviationEngine.from_centred(centre, ideal_centred[:, start:stop], ideal_sq_norms[start:stop])
+        deviations = engine.sum_squared_deviations(train_matrix)
+        # Drop the views on the shared buffer before closing it
+        del engine, ideal_centred, ideal_sq_norms, centre
+        return start, stop, deviations
+    finally:
+        shm.close()
+
+def parallel_sum_squared_deviations(train_matrix, ideal_matrix, workers=None):
+    """
+    Calculate the sum of squared deviations for every train and ideal column pair on several cores.
+
+    The ideal matrix is centred straight into shared memory, next to its column norms
+    and the centre, so the parent holds no second copy and the tasks only receive the
+    name of the buffer and their column range. The ideal columns are split into
+    contiguous ranges, one task per range, and the partial results are written back
+    into place. The result therefore does not depend on the number of workers or on
+    the order in which tasks finish.
+
+    Args:
+        train_matrix (ndarray): Training values of shape (rows, train functions).
+        ideal_matrix (ndarray): Ideal values of shape (rows, ideal functions).
+        workers (int or None): Number of processes, None for one per CPU.
+
+    Returns:
+        ndarray: Deviations of shape (train functions, ideal functions).
+    """
+    workers = resolve_workers(workers)
+    ideal_matrix = np.asarray(ideal_matrix, dtype=np.float64)
+    train_matrix = np.asarray(train_matrix, dtype=np.float64)
+    if ideal_matrix.ndim != 2:
+        raise ValueError("ideal_matrix must be two-dimensional (rows, functions)")
+    n_rows, n_ideal = ideal_matrix.shape
+    if workers == 1 or n_ideal < 2:
+        return DeviationEngine(ideal_matrix).sum_squared_deviations(train_matrix)
+    if train_matrix.shape[0] != n_rows:
+        raise ValueError(f"train_matrix has {train_matrix.shape[0]} rows, expected {n_rows}")
+
+    shm = shared_memory.SharedMemory(create=True, size=8 * (n_rows * n_ideal + n_ideal + n_rows))
+    try:
+        ideal_centred, ideal_sq_norms, centre = _shared_arrays(shm.buf, n_rows, n_ideal)
+        centre[:] = ideal_matrix.mean(axis=1, keepdims=True)
+        np.subtract(ideal_matrix, centre, out=ideal_centred)
+        np.einsum('ij,ij->j', ideal_centred, ideal_centred, out=ideal_sq_norms)
+        del ideal_centred, ideal_sq_norms, centre
+
+        bounds = np.linspace(0, n_ideal, min(workers, n_ideal) + 1).astype(int)
+        deviations = np.empty((train_matrix.shape[1], n_ideal), dtype=np.float64)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_deviation_block, shm.name, n_rows, n_ideal, train_matrix, start, stop)
+                for start, stop in zip(bounds[:-1], bounds[1:])
+            ]
+            for future in futures:
+                start, stop, block = future.result()
+                deviations[:, start:stop] = block
+        return deviations
+    finally:
+        shm.close()
+        shm.unlink()
@@ -0,0 +1,148 @@
+import hashlib
+import pandas as pd
+from src.data_handler import bulk_load, write_table
+
+def file_fingerprint(path, block_size=1 << 20):
+    """
+    Calculate the SHA-256 content hash of a file.
+
+    Args:
+        path (str): Path to the file.
+        block_size (int): Number of bytes read at a time.
+
+    Returns:
+        str: Hex digest of the file contents.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class ResultCache:
+    """
+    ResultCache class for persisting pipeline results in SQLite, keyed by input content hashes.
+
+    Deviations and the selected ideal functions are stored under a selection key built
+    from the train and ideal hashes. Test results are stored under the same key together
+    with every test point that was already mapped, matched or not, so only new test
+    points need mapping when the test data changes.
+
+    Attributes:
+        engine (Engine): SQLAlchemy engine of the SQLite database.
+    """
+    inputs_table = 'pipeline_inputs'
+    deviations_table = 'cached_deviations'
+    best_table = 'cached_best_ideal_functions'
+    results_table = 'cached_test_results'
+    points_table = 'cached_test_points'
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    @staticmethod
+    def selection_key(train_hash, ideal_hash):
+        """
+        Build the key under which results for a train and ideal input pair are stored.
+        """
+        return f'{train_hash}:{ideal_hash}'
+
+    def _has_table(self, table):
+        # SQLAlchemy is already loaded by the engine, so importing src.main stays light
+        from sqlalchemy import inspect
+        return inspect(self.engine).has_table(table)
+
+    def _read(self, table, key):
+        if not self._has_table(table):
+            return None
+        from sqlalchemy import text
+        query = text(f'SELECT * FROM "{table}" WHERE "Selection Key" = :key')
+        df = pd.read_sql(query, self.engine, params={'key': key})
+        return df.drop(columns='Selection Key')
+
+    def stored_input_hashes(self):
+        """
+        Get the hashes of the inputs currently saved in the train, ideal and test tables.
+
+        Returns:
+            dict: Input name mapped to its content hash.
+        """
+        if not self._has_table(self.inputs_table):
+            return {}
+        df = pd.read_sql(f'SELECT * FROM "{self.inputs_table}"', self.engine)
+        return dict(zip(df['Input'], df['Hash']))
+
+    def record_input_hashes(self, hashes):
+        """
+        Record the hashes of the inputs that were just saved to the database.
+
+        Args:
+            hashes (dict): Input name mapped to its content hash.
+        """
+        df = pd.DataFrame({'Input': list(hashes), 'Hash': list(hashes.values())})
+        with bulk_load(self.engine) as cursor:
+            write_table(cursor, self.inputs_table, df)
+
+    def load_selection(self, key):
+        """
+        Load the cached deviations and best ideal functions for a selection key.
+
+        Returns:
+            tuple: (deviation_df, best_ideal_functions), or None if nothing is cached.
+        """
+        best_ideal_functions = self._read(self.best_table, key)
+        if best_ideal_functions is None or best_ideal_functions.empty:
+            return None
+        return self._read(self.deviations_table, key), best_ideal_functions
+
+    def store_selection(self, key, deviation_df, best_ideal_functions):
+        """
+        Store the deviations and best ideal functions under a selection key.
+        """
+        with bulk_load(self.engine) as cursor:
+            for table, df in ((self.deviations_table, deviation_df), (self.best_table, best_ideal_functions)):
+                self._replace_key(cursor, table, key, df)
+
+    def load_test_results(self, key, test_df):
+        """
+        Split the test data into cached results and points that still need mapping.
+
+        Args:
+            key (str): Selection key the results belong to.
+            test_df (DataFrame): Current test data with 'x' and 'y' columns.
+
+        Returns:
+            tuple: (cached results for the current test points in test_df order,
+                DataFrame of the unique test points that were never mapped).
+        """
+        points = test_df[['x', 'y']].astype(float)
+        mapped = self._read(self.points_table, key)
+        results = self._read(self.results_table, key)
+        if mapped is None or results is None:
+            return results, points.drop_duplicates().reset_index(drop=True)
+
+        known = points.merge(mapped.drop_duplicates(), on=['x', 'y'], how='left', indicator=True)['_merge'] == 'both'
+        new_points = points[~known.to_numpy()].drop_duplicates().reset_index(drop=True)
+        cached_results = points.merge(results, on=['x', 'y'], how='inner')
+        return cached_results, new_points
+
+    def store_test_results(self, key, new_points, new_results):
+        """
+        Append newly mapped test points and their results under a selection key.
+        """
+        with bulk_load(self.engine) as cursor:
+            for table, df in ((self.points_table, new_points), (self.results_table, new_results)):
+                df = df.assign(**{'Selection Key': key})[['Selection Key'] + list(df.columns)]
+                write_table(cursor, table, df, replace=False)
+                self._index_key(cursor, table)
+
+    def _replace_key(self, cursor, table, key, df):
+        df = df.assign(**{'Selection Key': key})[['Selection Key'] + list(df.columns)]
+        if self._has_table(table):
+            cursor.execute(f'DELETE FROM "{table}" WHERE "Selection Key" = ?', (key,))
+        write_table(cursor, table, df, replace=False)
+        self._index_key(cursor, table)
+
+    @staticmethod
+    def _index_key(cursor, table):
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS "idx_{table}_key" ON "{table}" ("Selection Key")')
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+def categorical(names, codes):
+    """
+    Build a categorical column from function names and positions into them.
+
+    The categories are the names that occur, in sorted order, so sorting and grouping by
+    the column orders the functions like the plain strings would.
+
+    Args:
+        names (array-like): Function names, may contain duplicates.
+        codes (array-like): Positions into names, one per row.
+
+    Returns:
+        Categorical: One function name per row, stored as integer codes.
+    """
+    names = np.asarray(names, dtype=object)
+    codes = np.asarray(codes, dtype=np.intp)
+    used = np.zeros(len(names), dtype=bool)
+    used[codes] = True
+    categories, inverse = np.unique(names[used], return_inverse=True)
+    remap = np.zeros(len(names), dtype=np.intp)
+    remap[used] = inverse
+    return pd.Categorical.from_codes(remap[codes], categories=categories)
+
+def category_codes(names):
+    """
+    Precompute the categorical dtype of a fixed list of names and the code of each name.
+
+    Callers that build many categorical columns over the same names, e.g. one per mapped
+    batch, reuse both with pd.Categorical.from_codes(codes[positions], dtype=dtype)
+    instead of sorting the names again for every column.
+
+    Args:
+        names (array-like): Function names, may contain duplicates.
+
+    Returns:
+        tuple: The CategoricalDtype with the sorted unique names and the code of each name.
+    """
+    categories, codes = np.unique(np.asarray(names, dtype=object), return_inverse=True)
+    return pd.CategoricalDtype(categories), codes.astype(np.intp)
+
+class ResultBuffer:
+    """
+    ResultBuffer class for collecting result rows in preallocated typed arrays.
+
+    Numeric columns are stored in arrays of their own dtype and function name columns
+    as int32 codes into a shared list of names, instead of one tuple of Python objects
+    per row. The arrays grow by doubling, and the DataFrame, with categorical name
+    columns, is only built once by to_frame.
+
+    Attributes:
+        columns (dict): Numeric column names mapped to their dtypes.
+        names (dict): Name column names mapped to the function names their codes refer to.
+    """
+    def __init__(self, columns, names, capacity=1024):
+        self.columns = dict(columns)
+        self.names = {col: np.asarray(values, dtype=object) for col, values in names.items()}
+        self._order = list(names) + list(columns)
+        capacity = max(int(capacity), 1)
+        self._arrays = {col: np.empty(capacity, dtype=dtype) for col, dtype in self.columns.items()}
+        self._arrays.update({col: np.empty(capacity, dtype=np.int32) for col in self.names})
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, **values):
+        """
+        Append rows given as one array or scalar per column.
+
+        Name columns take codes, i.e. positions into their list of names.
+        """
+        n = max((np.size(value) for value in values.values()), default=0)
+        if set(values) != set(self._arrays):
+            raise KeyError(f"Expected values for the columns {self._order}")
+        self._reserve(self._size + n)
+        for col, value in values.items():
+            self._arrays[col][self._size:self._size + n] = value
+        self._size += n
+
+    def _reserve(self, size):
+        capacity = len(next(iter(self._arrays.values())))
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        for col, array in self._arrays.items():
+            grown = np.empty(capacity, dtype=array.dtype)
+            grown[:self._size] = array[:self._size]
+            self._arrays[col] = grown
+
+    def to_frame(self):
+        """
+        Convert the collected rows to a DataFrame with categorical name columns.
+
+        Returns:
+            DataFrame: The rows, name columns first in the order they were declared.
+        """
+        data = {}
+        for col in self._order:
+            values = self._arrays[col][:self._size]
+            data[col] = categorical(self.names[col], values) if col in self.names else values.copy()
+        return pd.DataFrame(data)
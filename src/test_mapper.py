@@ -1,4 +1,74 @@
+import numpy as np
 import pandas as pd
+from src.data_handler import bulk_load, write_table
+from src.results import category_codes
+
+X_POLICIES = ('reject', 'nearest', 'interpolate')
+MATCH_POLICIES = ('first', 'best')
+
+class IdealIndex:
+    """
+    IdealIndex class for resolving x values to rows of the ideal functions table.
+
+    The x grid is sorted once, so every lookup is a binary search instead of a scan
+    of the ideal table.
+
+    Attributes:
+        x_sorted (ndarray): Sorted x grid of the ideal functions.
+        row_order (ndarray): Positions of the ideal rows in sorted x order.
+        x_policy (str): How x values that are not on the grid are resolved: 'reject'
+            leaves them unmatched, 'nearest' uses the closest grid point and
+            'interpolate' interpolates linearly between the neighbouring grid points.
+    """
+    def __init__(self, ideal_df, x_policy='reject'):
+        if x_policy not in X_POLICIES:
+            raise ValueError(f"Unknown x_policy '{x_policy}', expected one of {X_POLICIES}")
+        self.ideal_df = ideal_df
+        self.x_policy = x_policy
+        x_values = ideal_df['x'].to_numpy(dtype=np.float64)
+        self.row_order = np.argsort(x_values, kind='stable')
+        self.x_sorted = x_values[self.row_order]
+        self._matrices = {}
+
+    def lookup(self, x_values, columns):
+        """
+        Look up the ideal function values at the given x values.
+
+        Args:
+            x_values (array-like): The x values to resolve.
+            columns (list): The ideal functions to read.
+
+        Returns:
+            tuple: Array of shape (len(x_values), len(columns)) with the ideal values and
+                a boolean array marking which x values could be resolved.
+        """
+        x_values = np.asarray(x_values, dtype=np.float64)
+        key = tuple(columns)
+        if key not in self._matrices:
+            self._matrices[key] = self.ideal_df[list(columns)].to_numpy(dtype=np.float64)[self.row_order]
+        ideal_matrix = self._matrices[key]
+        n_grid = len(self.x_sorted)
+        if n_grid == 0:
+            return np.full((len(x_values), len(columns)), np.nan), np.zeros(len(x_values), dtype=bool)
+
+        right = np.clip(np.searchsorted(self.x_sorted, x_values, side='left'), 0, n_grid - 1)
+        exact = self.x_sorted[right] == x_values
+        if self.x_policy == 'reject':
+            return ideal_matrix[right], exact
+
+        left = np.clip(right - 1, 0, n_grid - 1)
+        if self.x_policy == 'nearest':
+            use_left = np.abs(x_values - self.x_sorted[left]) <= np.abs(self.x_sorted[right] - x_values)
+            nearest = np.where(exact, right, np.where(use_left, left, right))
+            return ideal_matrix[nearest], ~np.isnan(x_values)
+
+        # Linear interpolation inside the grid, no extrapolation beyond it
+        inside = (x_values >= self.x_sorted[0]) & (x_values <= self.x_sorted[-1])
+        span = self.x_sorted[right] - self.x_sorted[left]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            weight = np.where(exact | (span == 0), 1.0, (x_values - self.x_sorted[left]) / span)
+        values = ideal_matrix[left] + weight[:, None] * (ideal_matrix[right] - ideal_matrix[left])
+        return values, inside
 
 class BaseTestMapper:
     """
@@ -16,10 +86,119 @@ class TestMapper(BaseTestMapper):
 
     Attributes:
         test_results_df (DataFrame): DataFrame to store the mapping results.
+        x_policy (str): How test x values that are not on the ideal grid are resolved,
+            one of 'reject', 'nearest' or 'interpolate'.
+        match_policy (str): Which function a test point is assigned to when several are
+            within their threshold: 'first' takes the first in best_ideal_functions order,
+            'best' takes the one with the smallest absolute deviation.
     """
-    def __init__(self, test_df, ideal_df, train_df, best_ideal_functions):
+    def __init__(self, test_df, ideal_df, train_df, best_ideal_functions, x_policy='reject', match_policy='first'):
         super().__init__(test_df, ideal_df, train_df, best_ideal_functions)
+        if x_policy not in X_POLICIES:
+            raise ValueError(f"Unknown x_policy '{x_policy}', expected one of {X_POLICIES}")
+        if match_policy not in MATCH_POLICIES:
+            raise ValueError(f"Unknown match_policy '{match_policy}', expected one of {MATCH_POLICIES}")
+        self.x_policy = x_policy
+        self.match_policy = match_policy
         self.test_results_df = pd.DataFrame()
+        self._index = None
+
+    def thresholds(self):
+        """
+        Get the maximum deviation between each selected ideal function and its training function.
+
+        Uses the 'Max Deviation' column of best_ideal_functions when FunctionSelector
+        provided it, otherwise computes each value once.
+
+        Returns:
+            ndarray: The maximum deviation of each selected function pair.
+        """
+        if 'Max Deviation' in self.best_ideal_functions.columns:
+            return self.best_ideal_functions['Max Deviation'].to_numpy(dtype=np.float64)
+        return np.array([
+            ((self.ideal_df[ideal_func] - self.train_df[train_func]) ** 2).max() ** 0.5
+            for ideal_func, train_func in zip(self.best_ideal_functions['Ideal Function'],
+                                              self.best_ideal_functions['Train Function'])
+        ], dtype=np.float64)
+
+    def prepare(self):
+        """
+        Build the x index and the mapping thresholds for the selected functions.
+
+        map_points reuses them for every batch of test points until prepare is called
+        again, e.g. after the ideal data or the selection changed.
+        """
+        self._ideal_funcs = list(self.best_ideal_functions['Ideal Function'])
+        self._train_funcs = list(self.best_ideal_functions['Train Function'])
+        self._ideal_dtype, self._ideal_codes = category_codes(self._ideal_funcs)
+        self._train_dtype, self._train_codes = category_codes(self._train_funcs)
+        self._index = IdealIndex(self.ideal_df, self.x_policy)
+        self._index.lookup([], self._ideal_funcs)
+        self._thresholds = self.thresholds() * (2 ** 0.5)
+
+    def map_points(self, x_values, y_values, return_positions=False):
+        """
+        Map a batch of test points with the prepared index and thresholds.
+
+        Args:
+            x_values (array-like): The x values of the test points.
+            y_values (array-like): The y values of the test points.
+            return_positions (bool): Also return the positions of the matched points.
+
+        Returns:
+            DataFrame: The matched test points with their deviations and functions, and
+                with return_positions an array of their positions in the input.
+        """
+        x_values = np.asarray(x_values)
+        y_values = np.asarray(y_values)
+        matched, chosen, deltas = self.match_arrays(x_values, y_values)
+        results = pd.DataFrame({
+            'x': x_values[matched],
+            'y': y_values[matched],
+            'Delta y': deltas,
+            'Ideal Function': pd.Categorical.from_codes(self._ideal_codes[chosen], dtype=self._ideal_dtype),
+            'Train Function': pd.Categorical.from_codes(self._train_codes[chosen], dtype=self._train_dtype)
+        })
+        return (results, matched) if return_positions else results
+
+    def match_arrays(self, x_values, y_values):
+        """
+        Match a batch of test points and return plain arrays instead of a DataFrame.
+
+        This is the kernel of map_points without building any result objects, for callers
+        such as the mapping service that answer a few points at a time.
+
+        Args:
+            x_values (ndarray): The x values of the test points.
+            y_values (ndarray): The y values of the test points.
+
+        Returns:
+            tuple: The positions of the matched points in the input, the position of the
+                chosen function pair in ideal_names and train_names for each of them, and
+                their deviations from the chosen ideal function.
+        """
+        if self._index is None:
+            self.prepare()
+        ideal_values, resolved = self._index.lookup(x_values, self._ideal_funcs)
+        return self._match(np.asarray(y_values, dtype=np.float64), ideal_values, resolved, self._thresholds)
+
+    @property
+    def ideal_names(self):
+        """
+        The selected ideal functions, indexed by the function positions of match_arrays.
+        """
+        if self._index is None:
+            self.prepare()
+        return self._ideal_funcs
+
+    @property
+    def train_names(self):
+        """
+        The training functions paired with ideal_names.
+        """
+        if self._index is None:
+            self.prepare()
+        return self._train_funcs
 
     def map_test_data(self):
         """
@@ -29,18 +208,8 @@ class TestMapper(BaseTestMapper):
             DataFrame: DataFrame containing the test data mapped to the ideal functions with deviations.
         """
         try:
-            test_results = []
-            for index, row in self.test_df.iterrows():
-                x_value = row['x']
-                y_value = row['y']
-                for _, ideal_row in self.best_ideal_functions.iterrows():
-                    ideal_func = ideal_row['Ideal Function']
-                    train_func = ideal_row['Train Function']
-                    max_deviation = ((self.ideal_df[ideal_func] - self.train_df[train_func]) ** 2).max() ** 0.5
-                    if abs(y_value - self.ideal_df.loc[self.ideal_df['x'] == x_value, ideal_func].values[0]) <= max_deviation * (2 ** 0.5):
-                        test_results.append((x_value, y_value, y_value - self.ideal_df.loc[self.ideal_df['x'] == x_value, ideal_func].values[0], ideal_func, train_func))
-                        break
-            self.test_results_df = pd.DataFrame(test_results, columns=['x', 'y', 'Delta y', 'Ideal Function', 'Train Function'])
+            self.prepare()
+            self.test_results_df = self.map_points(self.test_df['x'].to_numpy(), self.test_df['y'].to_numpy())
             return self.test_results_df
         except KeyError as e:
             print(f"Error: {e}")
@@ -48,3 +217,71 @@ class TestMapper(BaseTestMapper):
         except Exception as e:
             print(f"An unexpected error occurred: {e}")
             raise
+
+    def iter_map_chunks(self, chunks):
+        """
+        Map test data that arrives in chunks, e.g. from DataHandler.iter_test_chunks.
+
+        The index and thresholds are prepared once and only one chunk of test points
+        and its results are held at a time.
+
+        Args:
+            chunks (iterable): DataFrames with 'x' and 'y' columns.
+
+        Yields:
+            DataFrame: The mapping results of each chunk.
+        """
+        try:
+            self.prepare()
+            for chunk in chunks:
+                yield self.map_points(chunk['x'].to_numpy(), chunk['y'].to_numpy())
+        except KeyError as e:
+            print(f"Error: {e}")
+            raise
+
+    def map_chunks_to_db(self, chunks, engine, table='test_results', chunksize=10000):
+        """
+        Map test data chunk by chunk and append the results to an SQLite table.
+
+        The table is replaced by the first chunk and each chunk is committed on its own,
+        so memory use does not grow with the size of the input. Without any chunk the
+        table is replaced by an empty one, so results of an earlier run never remain.
+
+        Args:
+            chunks (iterable): DataFrames with 'x' and 'y' columns.
+            engine (Engine): SQLAlchemy engine of the SQLite database.
+            table (str): Name of the results table.
+            chunksize (int): Number of rows passed to each executemany call.
+
+        Returns:
+            int: Number of mapped test points written.
+        """
+        written = 0
+        replace = True
+        for results in self.iter_map_chunks(chunks):
+            with bulk_load(engine) as cursor:
+                write_table(cursor, table, results, chunksize, replace=replace)
+            replace = False
+            written += len(results)
+        if replace:
+            empty = self.map_points(np.empty(0), np.empty(0))
+            with bulk_load(engine) as cursor:
+                write_table(cursor, table, empty, chunksize)
+        return written
+
+    def _match(self, y_values, ideal_values, resolved, thresholds):
+        """
+        Assign test points to functions with one broadcast over (test points x selected functions).
+
+        Returns:
+            tuple: The positions of the matched test points in the input, the position of
+                the chosen function for each of them and their deviations.
+        """
+        deltas = y_values[:, None] - ideal_values
+        within = (np.abs(deltas) <= thresholds[None, :]) & resolved[:, None]
+        matched = np.nonzero(within.any(axis=1))[0]
+        if self.match_policy == 'first':
+            chosen = within[matched].argmax(axis=1)
+        else:
+            chosen = np.where(within[matched], np.abs(deltas[matched]), np.inf).argmin(axis=1)
+        return matched, chosen, deltas[matched, chosen]
@@ -1,6 +1,19 @@
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from bokeh.embed import file_html, json_item
 from bokeh.plotting import figure, show
-from bokeh.models import ColumnDataSource
+from bokeh.models import ColumnDataSource, LinearColorMapper
 from bokeh.layouts import column
+from bokeh.palettes import Reds9
+from bokeh.resources import CDN
+from src.decimation import DECIMATORS
+
+EXPORT_FORMATS = ('html', 'json', 'png')
+# Test points drawn individually by for_large_data, larger scatters become a density image
+LARGE_TEST_POINTS = 5000
 
 class BaseVisualizer:
     """
@@ -15,65 +28,135 @@ class Visualizer(BaseVisualizer):
     """
     Visualizer class for creating plots of the training data, ideal functions, and test results.
 
+    Large series can be kept to a bounded payload: lines longer than max_line_points
+    are decimated, and test scatters with more than max_test_points points are drawn
+    as a test_bins x test_bins density image instead of one glyph per point.
+
+    Attributes:
+        max_line_points (int): Maximum points per train or ideal line, None to keep all.
+        decimation (str): 'minmax' to keep the extremes of each bucket, 'lttb' for
+            Largest-Triangle-Three-Buckets.
+        max_test_points (int): Maximum test points drawn individually, None to draw all.
+        test_bins (int): Number of bins per axis of the test density image.
+        output_backend (str): Bokeh output backend, 'canvas', 'webgl' or 'svg'.
+
     Methods:
         visualize: Create and display the plots.
+        build_plots: Create the plots without displaying them.
+        export: Write the plots to files, optionally in parallel.
     """
-    def __init__(self, train_df, ideal_df, test_results_df):
+    def __init__(self, train_df, ideal_df, test_results_df, max_line_points=None, decimation='minmax',
+                 max_test_points=None, test_bins=200, output_backend='canvas'):
         super().__init__(train_df, ideal_df, test_results_df)
+        if decimation not in DECIMATORS:
+            raise ValueError(f"Unknown decimation '{decimation}', expected one of {sorted(DECIMATORS)}")
+        self.max_line_points = max_line_points
+        self.decimation = decimation
+        self.max_test_points = max_test_points
+        self.test_bins = test_bins
+        self.output_backend = output_backend
+
+    @classmethod
+    def for_large_data(cls, train_df, ideal_df, test_results_df, screen_width=1200):
+        """
+        Create a Visualizer that decimates to screen resolution and renders with WebGL.
+
+        Args:
+            screen_width (int): Horizontal resolution the lines are decimated to.
+
+        Returns:
+            Visualizer: Visualizer with bounded payload settings.
+        """
+        return cls(train_df, ideal_df, test_results_df, max_line_points=2 * screen_width,
+                   max_test_points=LARGE_TEST_POINTS, output_backend='webgl')
+
+    @classmethod
+    def for_data(cls, train_df, ideal_df, test_results_df, screen_width=1200):
+        """
+        Create a Visualizer that switches to for_large_data when the plots would exceed its limits.
+
+        Lines longer than 2 * screen_width points or more than LARGE_TEST_POINTS test
+        results select the decimating WebGL settings, smaller data is plotted in full.
+
+        Args:
+            screen_width (int): Horizontal resolution the lines are decimated to.
+
+        Returns:
+            Visualizer: Visualizer with settings suited to the size of the data.
+        """
+        if max(len(train_df), len(ideal_df)) > 2 * screen_width or len(test_results_df) > LARGE_TEST_POINTS:
+            return cls.for_large_data(train_df, ideal_df, test_results_df, screen_width)
+        return cls(train_df, ideal_df, test_results_df)
 
     def visualize(self):
         """
         Create and display plots for training data, ideal functions, and test results using Bokeh.
         """
+        plots = self.build_plots()
+        if plots:
+            show(column(*plots))
+        else:
+            print("No valid plots to display.")
+
+    def build_plots(self):
+        """
+        Create one Bokeh figure per mapped ideal function without displaying them.
+
+        Returns:
+            list: The figures, in the order the ideal functions appear in the test results.
+        """
         try:
             plots = []
-            if 'Train Function' not in self.test_results_df.columns:
-                raise KeyError("'Train Function' not found in test_results_df columns")
+            for ideal_func in self._plottable_functions():
+                p = self._build_plot(ideal_func)
+                if p is not None:
+                    plots.append(p)
+            return plots
 
-            for ideal_func in self.test_results_df['Ideal Function'].unique():
-                if ideal_func not in self.ideal_df.columns:
-                    print(f"Skipping visualization for {ideal_func} as it is not present in ideal_df columns.")
-                    continue
-                
-                print(f"Visualizing {ideal_func}...")
+        except KeyError as e:
+            print(f"Error: {e}")
+            raise
+        except Exception as e:
+            print(f"An unexpected error occurred: {e}")
+            raise
 
-                if self.ideal_df[ideal_func].isnull().all():
-                    print(f"Skipping visualization for {ideal_func} in ideal_df as it contains only NaN values.")
-                    continue
+    def export(self, output_dir, fmt='html', workers=1):
+        """
+        Write one file per mapped ideal function without opening a browser.
+
+        Figures are independent, so with several workers they are generated in parallel
+        processes, each receiving only the columns of its own figure.
 
-                p = figure(title=f'Function: {ideal_func}', x_axis_label='x', y_axis_label='y')
+        Args:
+            output_dir (str): Directory the files are written to. It is created if needed.
+            fmt (str): 'html' for standalone Bokeh pages, 'json' for Bokeh JSON items to
+                embed, or 'png' for static images rendered with matplotlib.
+            workers (int): Number of processes generating the figures.
 
-                train_func = self.test_results_df[self.test_results_df['Ideal Function'] == ideal_func]['Train Function'].iloc[0]
+        Returns:
+            list: Paths of the written files.
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown format '{fmt}', expected one of {EXPORT_FORMATS}")
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        try:
+            os.makedirs(output_dir, exist_ok=True)
+            tasks = []
+            for ideal_func in self._plottable_functions():
+                test_data = self.test_results_df[self.test_results_df['Ideal Function'] == ideal_func]
+                train_func = test_data['Train Function'].iloc[0]
                 if train_func not in self.train_df.columns:
                     print(f"Skipping visualization for {ideal_func} as {train_func} is not present in train_df columns.")
                     continue
+                path = os.path.join(output_dir, f"{_safe_filename(ideal_func)}.{fmt}")
+                tasks.append((self.train_df[['x', train_func]], self.ideal_df[['x', ideal_func]], test_data,
+                              self._settings(), ideal_func, fmt, path))
 
-                source_train = ColumnDataSource(data={
-                    'x': self.train_df['x'], 
-                    'y': self.train_df[train_func]
-                })
-                p.line('x', 'y', source=source_train, legend_label=f'Train: {train_func}', line_color='blue')
-
-                source_ideal = ColumnDataSource(data={
-                    'x': self.ideal_df['x'], 
-                    'y': self.ideal_df[ideal_func]
-                })
-                p.line('x', 'y', source=source_ideal, legend_label=f'Ideal: {ideal_func}', line_color='green')
-
-                test_data = self.test_results_df[self.test_results_df['Ideal Function'] == ideal_func]
-                source_test = ColumnDataSource(data={
-                    'x': test_data['x'], 
-                    'y': test_data['y']
-                })
-                p.circle('x', 'y', source=source_test, legend_label='Test Data', fill_color='red', size=8)
-
-                p.legend.title = 'Legend'
-                plots.append(p)
-
-            if plots:
-                show(column(*plots))
-            else:
-                print("No valid plots to display.")
+            if workers == 1 or len(tasks) < 2:
+                return [_export_figure(*task) for task in tasks]
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                return list(executor.map(_export_figure, *zip(*tasks)))
 
         except KeyError as e:
             print(f"Error: {e}")
@@ -81,3 +164,130 @@ class Visualizer(BaseVisualizer):
         except Exception as e:
             print(f"An unexpected error occurred: {e}")
             raise
+
+    def _settings(self):
+        return {
+            'max_line_points': self.max_line_points,
+            'decimation': self.decimation,
+            'max_test_points': self.max_test_points,
+            'test_bins': self.test_bins,
+            'output_backend': self.output_backend
+        }
+
+    def _plottable_functions(self):
+        """
+        Get the mapped ideal functions that can be plotted.
+        """
+        if 'Train Function' not in self.test_results_df.columns:
+            raise KeyError("'Train Function' not found in test_results_df columns")
+
+        functions = []
+        for ideal_func in self.test_results_df['Ideal Function'].unique():
+            if ideal_func not in self.ideal_df.columns:
+                print(f"Skipping visualization for {ideal_func} as it is not present in ideal_df columns.")
+                continue
+            if self.ideal_df[ideal_func].isnull().all():
+                print(f"Skipping visualization for {ideal_func} in ideal_df as it contains only NaN values.")
+                continue
+            functions.append(ideal_func)
+        return functions
+
+    def _build_plot(self, ideal_func):
+        """
+        Create the figure of one ideal function, or None if its training function is missing.
+        """
+        print(f"Visualizing {ideal_func}...")
+
+        p = figure(title=f'Function: {ideal_func}', x_axis_label='x', y_axis_label='y',
+                   output_backend=self.output_backend)
+
+        test_data = self.test_results_df[self.test_results_df['Ideal Function'] == ideal_func]
+        train_func = test_data['Train Function'].iloc[0]
+        if train_func not in self.train_df.columns:
+            print(f"Skipping visualization for {ideal_func} as {train_func} is not present in train_df columns.")
+            return None
+
+        source_train = ColumnDataSource(data=self._line_data(self.train_df['x'], self.train_df[train_func]))
+        p.line('x', 'y', source=source_train, legend_label=f'Train: {train_func}', line_color='blue')
+
+        source_ideal = ColumnDataSource(data=self._line_data(self.ideal_df['x'], self.ideal_df[ideal_func]))
+        p.line('x', 'y', source=source_ideal, legend_label=f'Ideal: {ideal_func}', line_color='green')
+
+        if self.max_test_points is not None and len(test_data) > self.max_test_points:
+            self._add_test_density(p, test_data)
+        else:
+            source_test = ColumnDataSource(data={
+                'x': test_data['x'],
+                'y': test_data['y']
+            })
+            p.scatter('x', 'y', source=source_test, legend_label='Test Data', marker='circle',
+                      fill_color='red', size=8)
+
+        p.legend.title = 'Legend'
+        return p
+
+    def _render_png(self, ideal_func, path):
+        """
+        Render the figure of one ideal function as a static image with matplotlib.
+        """
+        # Draw on an Agg canvas directly, so the matplotlib backend of the host application is left alone
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        test_data = self.test_results_df[self.test_results_df['Ideal Function'] == ideal_func]
+        train_func = test_data['Train Function'].iloc[0]
+        fig = Figure(figsize=(8, 6))
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        ax.plot(*self._line_data(self.train_df['x'], self.train_df[train_func]).values(),
+                color='blue', label=f'Train: {train_func}')
+        ax.plot(*self._line_data(self.ideal_df['x'], self.ideal_df[ideal_func]).values(),
+                color='green', label=f'Ideal: {ideal_func}')
+        if self.max_test_points is not None and len(test_data) > self.max_test_points:
+            ax.hist2d(test_data['x'], test_data['y'], bins=self.test_bins, cmin=1, cmap='Reds')
+        else:
+            ax.scatter(test_data['x'], test_data['y'], color='red', s=16, label='Test Data')
+        ax.set(title=f'Function: {ideal_func}', xlabel='x', ylabel='y')
+        ax.legend(title='Legend')
+        fig.savefig(path)
+
+    def _line_data(self, x, y):
+        """
+        Get the data of a line, decimated when it is longer than max_line_points.
+        """
+        x = x.to_numpy()
+        y = y.to_numpy()
+        if self.max_line_points is not None and len(x) > self.max_line_points:
+            x, y = DECIMATORS[self.decimation](x, y, self.max_line_points)
+        return {'x': x, 'y': y}
+
+    def _add_test_density(self, p, test_data):
+        """
+        Draw the test points as a density image with test_bins x test_bins cells.
+        """
+        x = test_data['x'].to_numpy(dtype=np.float64)
+        y = test_data['y'].to_numpy(dtype=np.float64)
+        counts, x_edges, y_edges = np.histogram2d(x, y, bins=self.test_bins)
+        counts[counts == 0] = np.nan
+        mapper = LinearColorMapper(palette=Reds9[::-1], low=1, high=np.nanmax(counts), nan_color=(0, 0, 0, 0))
+        p.image(image=[counts.T], x=x_edges[0], y=y_edges[0], dw=x_edges[-1] - x_edges[0],
+                dh=y_edges[-1] - y_edges[0], color_mapper=mapper, legend_label='Test Data Density')
+
+def _safe_filename(name):
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', str(name))
+
+def _export_figure(train_df, ideal_df, test_data, settings, ideal_func, fmt, path):
+    """
+    Build and write the figure of one ideal function. Runs in a worker process.
+    """
+    visualizer = Visualizer(train_df, ideal_df, test_data, **settings)
+    if fmt == 'png':
+        visualizer._render_png(ideal_func, path)
+        return path
+    p = visualizer._build_plot(ideal_func)
+    with open(path, 'w', encoding='utf-8') as f:
+        if fmt == 'html':
+            f.write(file_html(p, CDN, title=f'Function: {ideal_func}'))
+        else:
+            json.dump(json_item(p), f)
+    return path
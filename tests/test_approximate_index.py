@@ -0,0 +1,106 @@
+import unittest
+import os
+import tempfile
+from unittest import mock
+import numpy as np
+import pandas as pd
+from src.approximate_index import ApproximateIdealIndex, ideal_fingerprint, index_path_for, selection_agreement
+from src.data_handler import DataHandler
+from src.function_selector import FunctionSelector
+
+class TestApproximateIdealIndex(unittest.TestCase):
+    def setUp(self):
+        """
+        Set up an ideal catalogue with training functions close to a few of its columns.
+        """
+        rng = np.random.default_rng(3)
+        x = np.linspace(-5, 5, 100)
+        self.ideal_data = pd.DataFrame(rng.normal(size=(100, 300)).cumsum(axis=0),
+                                       columns=[f'y{i}' for i in range(1, 301)])
+        self.ideal_data.insert(0, 'x', x)
+        self.train_data = pd.DataFrame({'x': x})
+        for i, col in enumerate(['y17', 'y150', 'y299', 'y3'], start=1):
+            self.train_data[f'y{i}'] = self.ideal_data[col] + rng.normal(0, 0.1, size=100)
+
+        selector = FunctionSelector(self.train_data, self.ideal_data)
+        selector.calculate_deviations()
+        self.exact = selector.select_ideal_functions()
+
+    def test_matches_exact_selection(self):
+        """
+        Test that the re-ranked shortlist agrees with the exact selection.
+        """
+        index = ApproximateIdealIndex(dimensions=16).build(self.ideal_data)
+        approximate = index.best_ideal_functions(self.train_data, self.ideal_data, shortlist_size=20)
+        agreement = selection_agreement(approximate, self.exact)
+
+        self.assertEqual(agreement['agreement'], 1.0)
+        self.assertEqual(agreement['mismatches'], [])
+        pd.testing.assert_frame_equal(approximate.sort_values('Train Function').reset_index(drop=True),
+                                      self.exact.sort_values('Train Function').reset_index(drop=True),
+                                      check_dtype=False)
+
+    def test_save_load_and_database_rerank(self):
+        """
+        Test building from the ideal table in blocks, persisting beside data.db and re-ranking from the database.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = 'sqlite:///' + os.path.join(tmp_dir, 'data.db')
+            handler = DataHandler(None, None, None, db_path)
+            handler.train_df, handler.ideal_df, handler.test_df = self.train_data, self.ideal_data, self.train_data[['x']]
+            handler.save_to_db()
+
+            path = index_path_for(db_path)
+            ApproximateIdealIndex(dimensions=16).build(handler.iter_ideal_blocks(block_size=64, source='db')).save(path)
+            index = ApproximateIdealIndex.load(path)
+            approximate = index.best_ideal_functions(self.train_data, handler, shortlist_size=20)
+            handler.engine.dispose()
+
+        self.assertEqual(path, os.path.join(tmp_dir, 'data.ann.npz'))
+        self.assertEqual(len(index.columns), 300)
+        self.assertEqual(selection_agreement(approximate, self.exact)['agreement'], 1.0)
+
+    def test_stale_index_is_detected(self):
+        """
+        Test that an index built before the ideal table changed is rejected on load and rebuilt.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = 'sqlite:///' + os.path.join(tmp_dir, 'data.db')
+            handler = DataHandler(None, None, None, db_path)
+            handler.train_df, handler.ideal_df, handler.test_df = self.train_data, self.ideal_data, self.train_data[['x']]
+            handler.save_to_db()
+            path = index_path_for(db_path)
+            built = ApproximateIdealIndex.load_or_build(path, handler, dimensions=16)
+            # The hash recorded by save_to_db is compared, the ideal table is not read again
+            with mock.patch.object(DataHandler, 'iter_ideal_blocks', side_effect=AssertionError), \
+                    mock.patch.object(DataHandler, 'read_table', side_effect=AssertionError):
+                loaded = ApproximateIdealIndex.load(path, handler)
+
+            changed = self.ideal_data.drop(columns='y300')
+            changed['y1'] = changed['y1'] + 1.0
+            handler.ideal_df = changed
+            handler.save_to_db(tables=('ideal',))
+            with self.assertRaises(ValueError):
+                ApproximateIdealIndex.load(path, handler)
+            rebuilt = ApproximateIdealIndex.load_or_build(path, handler, dimensions=16)
+            reloaded = ApproximateIdealIndex.load(path, changed)
+            with handler.engine.begin() as connection:
+                connection.exec_driver_sql('DROP TABLE table_fingerprints')
+            unrecorded = handler.table_fingerprint('ideal')
+            handler.engine.dispose()
+
+        self.assertEqual(built.fingerprint, ideal_fingerprint(self.ideal_data))
+        self.assertEqual(loaded.fingerprint, built.fingerprint)
+        self.assertEqual(rebuilt.fingerprint, ideal_fingerprint(changed))
+        self.assertEqual(list(reloaded.columns), list(changed.columns.drop('x')))
+        self.assertEqual(unrecorded, rebuilt.fingerprint)
+
+    def test_unbuilt_index(self):
+        """
+        Test querying an index that was never built.
+        """
+        with self.assertRaises(RuntimeError):
+            ApproximateIdealIndex().shortlist(self.train_data)
+
+if __name__ == '__main__':
+    unittest.main()
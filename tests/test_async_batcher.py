@@ -0,0 +1,115 @@
+import unittest
+import asyncio
+import threading
+import pandas as pd
+from src.async_batcher import MappingBatcher
+from src.test_mapper import TestMapper
+
+class TestMappingBatcher(unittest.TestCase):
+    def setUp(self):
+        """
+        Set up a prepared mapper and a batch function recording its calls.
+        """
+        ideal_data = pd.DataFrame({'x': [1, 2, 3], 'y1': [2, 4, 6], 'y2': [1, 2, 3]})
+        best_ideal_functions = pd.DataFrame({
+            'Train Function': ['y1', 'y2'], 'Ideal Function': ['y1', 'y2'], 'Max Deviation': [0.1, 0.1]
+        })
+        self.mapper = TestMapper(None, ideal_data, ideal_data, best_ideal_functions)
+        self.mapper.prepare()
+        self.calls = []
+
+    def map_batch(self, x_values, y_values):
+        self.calls.append(len(x_values))
+        results, matched = self.mapper.map_points(x_values, y_values, return_positions=True)
+        mapped = [None] * len(x_values)
+        for position, ideal_func in zip(matched, results['Ideal Function']):
+            mapped[position] = ideal_func
+        return mapped
+
+    def test_concurrent_requests_are_batched(self):
+        """
+        Test that concurrent requests are mapped in one call and fanned back out in order.
+        """
+        async def run():
+            async with MappingBatcher(self.map_batch, max_wait=0.05) as batcher:
+                results = await asyncio.gather(
+                    batcher.map_points([[1, 2], [2, 2]]),
+                    batcher.map_points([[3, 3]]),
+                    batcher.map_points([[3, 100]])
+                )
+                return results, batcher.metrics()
+
+        results, metrics = asyncio.run(run())
+
+        self.assertEqual(results, [['y1', 'y2'], ['y2'], [None]])
+        self.assertEqual(self.calls, [4])
+        self.assertEqual(metrics['requests'], 3)
+        self.assertEqual(metrics['batches'], 1)
+        self.assertEqual(metrics['batch_size_max'], 4)
+        self.assertGreaterEqual(metrics['latency_p99'], metrics['latency_p50'])
+
+    def test_max_batch_size(self):
+        """
+        Test that a batch is closed once it reaches the size limit.
+        """
+        async def run():
+            async with MappingBatcher(self.map_batch, max_batch_size=2, max_wait=0.05) as batcher:
+                return await asyncio.gather(*(batcher.map_points([[1, 2]]) for _ in range(5)))
+
+        results = asyncio.run(run())
+
+        self.assertEqual(results, [['y1']] * 5)
+        self.assertEqual(self.calls, [2, 2, 1])
+
+    def test_errors_reach_every_caller(self):
+        """
+        Test that an error in the batch function is raised for every request of the batch.
+        """
+        def failing_batch(x_values, y_values):
+            raise ValueError("mapping failed")
+
+        async def run():
+            async with MappingBatcher(failing_batch, max_wait=0.05) as batcher:
+                return await asyncio.gather(batcher.map_points([[1, 2]]), batcher.map_points([[2, 4]]),
+                                            return_exceptions=True)
+
+        results = asyncio.run(run())
+
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+
+    def test_metrics_empty(self):
+        """
+        Test the metrics before any request.
+        """
+        metrics = MappingBatcher(self.map_batch).metrics()
+
+        self.assertEqual(metrics['requests'], 0)
+        self.assertIsNone(metrics['latency_p50'])
+
+    def test_stop_during_batch(self):
+        """
+        Test that stopping while a batch is mapped cancels its callers and the queued ones.
+        """
+        started, release = threading.Event(), threading.Event()
+
+        def slow_batch(x_values, y_values):
+            started.set()
+            release.wait(5)
+            return self.map_batch(x_values, y_values)
+
+        async def run():
+            batcher = MappingBatcher(slow_batch, max_wait=0)
+            await batcher.start()
+            in_flight = asyncio.ensure_future(batcher.map_points([[1, 2]]))
+            await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+            queued = asyncio.ensure_future(batcher.map_points([[2, 4]]))
+            await asyncio.sleep(0)
+            await batcher.stop()
+            release.set()
+            return await asyncio.wait_for(asyncio.gather(in_flight, queued, return_exceptions=True), 1)
+
+        results = asyncio.run(run())
+        self.assertTrue(all(isinstance(result, asyncio.CancelledError) for result in results))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+from src.batch_selector import BatchFunctionSelector
+from src.function_selector import FunctionSelector
+
+class TestBatchFunctionSelector(unittest.TestCase):
+    """
+    Unit tests for the BatchFunctionSelector class.
+    """
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        x = np.linspace(-10, 10, 40)
+        self.ideal_df = pd.DataFrame({'x': x, **{f'y{i}': rng.normal(size=len(x)) for i in range(1, 31)}})
+        self.tenants = {
+            f'sensor{t}': pd.DataFrame({'x': x, **{f'y{i}': self.ideal_df[f'y{3 * t + i}'] + rng.normal(0, 0.1, len(x))
+                                                   for i in range(1, 5)}})
+            for t in range(5)
+        }
+        self.selector = BatchFunctionSelector(self.ideal_df)
+
+    def test_select_matches_function_selector(self):
+        """
+        Test that every tenant gets the selection FunctionSelector makes on its own.
+        """
+        selections = self.selector.select_many(self.tenants)
+
+        self.assertEqual(len(selections), 20)
+        for tenant, train_df in self.tenants.items():
+            selector = FunctionSelector(train_df, self.ideal_df)
+            selector.calculate_deviations()
+            exact = selector.select_ideal_functions().set_index('Train Function')
+            batch = selections[selections['Tenant'] == tenant].set_index('Train Function')
+            for train_col in exact.index:
+                self.assertEqual(batch.loc[train_col, 'Ideal Function'], exact.loc[train_col, 'Ideal Function'])
+                self.assertAlmostEqual(batch.loc[train_col, 'Deviation'], exact.loc[train_col, 'Deviation'])
+                self.assertAlmostEqual(batch.loc[train_col, 'Max Deviation'], exact.loc[train_col, 'Max Deviation'])
+        np.testing.assert_allclose(selections['Threshold'], selections['Max Deviation'] * np.sqrt(2))
+        self.assertNotIn('Tenant', self.selector.select(self.tenants['sensor0']).columns)
+
+    def test_select_to_db(self):
+        """
+        Test that the selections of all tenants are written to one table.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            engine = create_engine('sqlite:///' + os.path.join(tmp_dir, 'data.db'))
+            renamed = {'other': self.tenants['sensor1'].rename(columns={'y1': 'temperature'})}
+            self.selector.select_to_db(renamed, engine)
+            selections = self.selector.select_to_db(self.tenants.items(), engine)
+            stored = pd.read_sql('SELECT * FROM tenant_best_ideal_functions', engine)
+            engine.dispose()
+
+        self.assertEqual(len(stored), len(selections))
+        self.assertEqual(sorted(stored['Tenant'].unique()), sorted(self.tenants))
+        self.assertEqual(list(stored['Ideal Function']), list(selections['Ideal Function'].astype(object)))
+
+    def test_mixed_training_function_names(self):
+        """
+        Test that tenants with different training function names are kept apart.
+        """
+        tenants = [('a', self.tenants['sensor0']), ('b', self.tenants['sensor1'].rename(columns={'y1': 'temperature'}))]
+        selections = self.selector.select_many(tenants)
+
+        self.assertEqual(list(selections.loc[selections['Tenant'] == 'b', 'Train Function']),
+                         ['temperature', 'y2', 'y3', 'y4'])
+        self.assertEqual(list(selections.loc[selections['Tenant'] == 'a', 'Ideal Function']),
+                         ['y1', 'y2', 'y3', 'y4'])
+
+    def test_later_tenant_with_several_new_names(self):
+        """
+        Test that a later tenant bringing several new training function names gets its own codes.
+        """
+        first = self.tenants['sensor0'][['x', 'y1', 'y2']]
+        second = self.tenants['sensor1'].rename(columns={'y1': 'p', 'y2': 'q', 'y3': 'r'})
+        selections = self.selector.select_many([('a', first), ('b', second)])
+
+        self.assertEqual(list(selections['Train Function']), ['y1', 'y2', 'p', 'q', 'r', 'y4'])
+        self.assertEqual(list(selections['Ideal Function']), ['y1', 'y2', 'y4', 'y5', 'y6', 'y7'])
+
+if __name__ == '__main__':
+    unittest.main()
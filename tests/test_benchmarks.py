@@ -0,0 +1,54 @@
+import unittest
+from benchmarks.run_benchmarks import STAGES, BenchmarkSuite, compare_to_baseline
+from benchmarks.synthetic import generate_data
+
+class TestBenchmarks(unittest.TestCase):
+    def test_generate_data(self):
+        """
+        Test the shapes of the synthetic data.
+        """
+        train_df, ideal_df, test_df = generate_data(rows=30, ideal_columns=8, train_columns=3, test_points=12)
+
+        self.assertEqual(train_df.shape, (30, 4))
+        self.assertEqual(ideal_df.shape, (30, 9))
+        self.assertEqual(test_df.shape, (12, 2))
+        self.assertTrue(test_df['x'].isin(ideal_df['x']).all())
+
+    def test_run(self):
+        """
+        Test that every stage reports its time and peak memory.
+        """
+        report = BenchmarkSuite(rows=30, ideal_columns=8, test_points=12, repeat=1).run()
+
+        self.assertEqual(set(report['results']), set(STAGES))
+        for result in report['results'].values():
+            self.assertGreater(result['seconds'], 0)
+            self.assertGreater(result['peak_memory_bytes'], 0)
+
+    def test_unknown_stage(self):
+        """
+        Test handling of an unknown stage name.
+        """
+        with self.assertRaises(ValueError):
+            BenchmarkSuite(repeat=1).run(('plot',))
+
+    def test_compare_to_baseline(self):
+        """
+        Test that slower or larger stages are reported as regressions.
+        """
+        baseline = {'results': {
+            'map_test_data': {'seconds': 1.0, 'peak_memory_bytes': 100},
+            'save_to_db': {'seconds': 1.0, 'peak_memory_bytes': 100}
+        }}
+        report = {'results': {
+            'map_test_data': {'seconds': 1.1, 'peak_memory_bytes': 100},
+            'save_to_db': {'seconds': 1.0, 'peak_memory_bytes': 200},
+            'visualize': {'seconds': 5.0, 'peak_memory_bytes': 100}
+        }}
+        comparison = compare_to_baseline(report, baseline, tolerance=0.25)
+
+        self.assertEqual(comparison['regressions'], ['save_to_db'])
+        self.assertNotIn('visualize', comparison['stages'])
+
+if __name__ == '__main__':
+    unittest.main()
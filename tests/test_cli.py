@@ -0,0 +1,78 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from src.cli import main
+from src.data_handler import DataHandler
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+class TestCli(unittest.TestCase):
+    """
+    Unit tests for the command line entry point.
+    """
+    IMPORT_BUDGET_SECONDS = 0.5
+
+    def test_import_budget(self):
+        """
+        Test that importing the CLI loads none of the heavy dependencies and stays within budget.
+        """
+        code = ("import json, sys, time\n"
+                "start = time.perf_counter()\n"
+                "import src.cli\n"
+                "seconds = time.perf_counter() - start\n"
+                "heavy = [name for name in ('bokeh', 'pandas', 'sqlalchemy', 'numpy') if name in sys.modules]\n"
+                "print(json.dumps({'seconds': seconds, 'heavy': heavy}))\n")
+        output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+        report = json.loads(output.stdout)
+
+        self.assertEqual(report['heavy'], [])
+        self.assertLess(report['seconds'], self.IMPORT_BUDGET_SECONDS)
+
+    def test_modules_import_sqlalchemy_lazily(self):
+        """
+        Test that importing the pipeline modules does not load SQLAlchemy before an engine is needed.
+        """
+        code = ("import sys\n"
+                "import src.data_handler, src.test_mapper, src.main\n"
+                "print('sqlalchemy' in sys.modules)\n")
+        output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+
+        self.assertEqual(output.stdout.strip(), 'False')
+
+    def test_subcommands(self):
+        """
+        Test the ingest, select, map and plot subcommands end to end on a temporary database.
+        """
+        x = np.linspace(-5, 5, 21)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            paths = [os.path.join(tmp_dir, name) for name in ('train.csv', 'ideal.csv', 'test.csv')]
+            pd.DataFrame({'x': x, 'y1': x + 0.05, 'y2': x ** 2}).to_csv(paths[0], index=False)
+            pd.DataFrame({'x': x, 'y1': x, 'y2': -x, 'y3': x ** 2 - 0.1}).to_csv(paths[1], index=False)
+            pd.DataFrame({'x': [0.0, 1.0, 2.0], 'y': [0.0, 0.9, 100.0]}).to_csv(paths[2], index=False)
+            options = ['--db', 'sqlite:///' + os.path.join(tmp_dir, 'data.db'),
+                       '--train', paths[0], '--ideal', paths[1], '--test', paths[2]]
+
+            self.assertEqual(main(options + ['ingest']), 0)
+            self.assertEqual(main(options + ['select']), 0)
+            self.assertEqual(main(options + ['map', '--chunksize', '2']), 0)
+            self.assertEqual(main(options + ['plot', '--output-dir', os.path.join(tmp_dir, 'plots'),
+                                             '--format', 'json']), 0)
+
+            handler = DataHandler(*paths, options[1])
+            best = pd.read_sql('SELECT * FROM best_ideal_functions', handler.engine)
+            results = pd.read_sql('SELECT * FROM test_results', handler.engine)
+            handler.engine.dispose()
+            self.assertEqual(list(best['Ideal Function']), ['y1', 'y3'])
+            self.assertEqual(list(results['x']), [0.0, 1.0])
+            self.assertEqual(sorted(os.listdir(os.path.join(tmp_dir, 'plots'))), ['y1.json', 'y3.json'])
+
+        with self.assertRaises(SystemExit):
+            main(['unknown'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from src.columnar_format import read_columnar, read_columnar_header, write_columnar
+from src.function_selector import FunctionSelector
+
+class TestColumnarFormat(unittest.TestCase):
+    def setUp(self):
+        """
+        Set up the test environment.
+        """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'ideal.bin')
+        self.ideal_data = pd.DataFrame({'x': [1, 2, 3], 'y1': [2, 4, 6], 'y2': [1, 2, 3], 'y3': [0, 1, 2]})
+
+    def tearDown(self):
+        """
+        Clean up the test environment.
+        """
+        self.tmp_dir.cleanup()
+
+    def test_round_trip(self):
+        """
+        Test writing and reading back the ideal functions.
+        """
+        write_columnar(self.ideal_data, self.path)
+        ideal_df = read_columnar(self.path)
+
+        pd.testing.assert_frame_equal(ideal_df, self.ideal_data.astype('float64'))
+
+    def test_header(self):
+        """
+        Test that the header describes the columns and the matrix is aligned.
+        """
+        write_columnar(self.ideal_data, self.path)
+        header = read_columnar_header(self.path)
+
+        self.assertEqual(header['columns'], ['x', 'y1', 'y2', 'y3'])
+        self.assertEqual(header['rows'], 3)
+        self.assertEqual(header['data_offset'] % 64, 0)
+        self.assertEqual(os.path.getsize(self.path), header['data_offset'] + 3 * 4 * 8)
+
+    def test_memory_mapped(self):
+        """
+        Test that the DataFrame columns are views on the mapped file.
+        """
+        write_columnar(self.ideal_data, self.path)
+        ideal_df = read_columnar(self.path)
+        values = ideal_df[['y1', 'y2']].to_numpy()
+        while not isinstance(values, np.memmap) and values.base is not None:
+            values = values.base
+
+        self.assertIsInstance(values, np.memmap)
+        self.assertFalse(values.flags.writeable)
+
+    def test_selector_on_mapped_data(self):
+        """
+        Test that the selector works on a memory-mapped ideal table.
+        """
+        write_columnar(self.ideal_data, self.path)
+        train_data = pd.DataFrame({'x': [1, 2, 3], 'y1': [2, 4, 6]})
+        selector = FunctionSelector(train_data, read_columnar(self.path))
+        selector.calculate_deviations()
+
+        self.assertEqual(list(selector.select_ideal_functions()['Ideal Function']), ['y1'])
+
+    def test_invalid_file(self):
+        """
+        Test handling of files in another format.
+        """
+        self.ideal_data.to_csv(self.path, index=False)
+        with self.assertRaises(ValueError):
+            read_columnar(self.path)
+
+if __name__ == '__main__':
+    unittest.main()
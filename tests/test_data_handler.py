@@ -1,5 +1,7 @@
 import unittest
+from unittest import mock
 import os
+import tempfile
 import pandas as pd
 from sqlalchemy import create_engine
 from src.data_handler import DataHandler
@@ -100,5 +102,156 @@ class TestDataHandler(unittest.TestCase):
         with self.assertRaises(pd.errors.ParserError):
             self.handler.load_data()
 
+class TestDataHandlerDatabase(unittest.TestCase):
+    def setUp(self):
+        """
+        Set up a temporary directory with CSV files and a database.
+        """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.train_path = os.path.join(self.tmp_dir.name, 'train.csv')
+        self.ideal_path = os.path.join(self.tmp_dir.name, 'ideal.csv')
+        self.test_path = os.path.join(self.tmp_dir.name, 'test.csv')
+        self.db_path = 'sqlite:///' + os.path.join(self.tmp_dir.name, 'data.db')
+
+        pd.DataFrame({'x': [1, 2, 3], 'y1': [2, 4, 6], 'y2': [1, 2, 3]}).to_csv(self.train_path, index=False)
+        pd.DataFrame({'x': [1, 2, 3], 'y1': [2, 4, 6], 'y2': [1, 2, 3], 'y3': [0, 1, 2]}).to_csv(self.ideal_path, index=False)
+        pd.DataFrame({'x': [1, 2, 3], 'y': [2, 4, 6]}).to_csv(self.test_path, index=False)
+        self.handler = DataHandler(self.train_path, self.ideal_path, self.test_path, self.db_path)
+
+    def tearDown(self):
+        """
+        Clean up the temporary directory.
+        """
+        self.handler.engine.dispose()
+        self.tmp_dir.cleanup()
+
+    def test_iter_ideal_blocks_csv(self):
+        """
+        Test reading the ideal functions from CSV in blocks of columns.
+        """
+        blocks = list(self.handler.iter_ideal_blocks(block_size=2))
+
+        self.assertEqual([list(block.columns) for block in blocks], [['x', 'y1', 'y2'], ['x', 'y3']])
+        self.assertEqual(list(blocks[1]['y3']), [0, 1, 2])
+
+    def test_iter_ideal_blocks_csv_parses_once(self):
+        """
+        Test that the CSV is parsed once in row chunks however many column blocks are read.
+        """
+        with mock.patch('src.data_handler.pd.read_csv', wraps=pd.read_csv) as read_csv:
+            blocks = list(self.handler.iter_ideal_blocks(block_size=1, chunksize=2))
+
+        self.assertEqual(len(blocks), 3)
+        self.assertEqual([call.kwargs.get('chunksize') for call in read_csv.call_args_list], [None, 2])
+        self.assertEqual(list(blocks[2]['x']), [1, 2, 3])
+        self.assertEqual(list(blocks[2]['y3']), [0, 1, 2])
+
+    def test_iter_ideal_blocks_csv_row_count(self):
+        """
+        Test that blank lines and quoted line breaks do not change the rows read from CSV,
+        and that a file with more rows than newlines is rejected.
+        """
+        with open(self.ideal_path, 'w', newline='') as f:
+            f.write('x,"y\n1",y2\n1,2,3\n\n2,4,6\n\n\n')
+        blocks = list(self.handler.iter_ideal_blocks(block_size=2))
+
+        self.assertEqual(list(blocks[0].columns), ['x', 'y\n1', 'y2'])
+        self.assertEqual(blocks[0].to_numpy().tolist(), [[1, 2, 3], [2, 4, 6]])
+
+        with open(self.ideal_path, 'w', newline='') as f:
+            f.write('x,y1\r1,2\r3,4\r')
+        with self.assertRaises(ValueError):
+            list(self.handler.iter_ideal_blocks())
+
+    def test_iter_ideal_blocks_db(self):
+        """
+        Test reading the ideal functions from the database in blocks of columns.
+        """
+        self.handler.load_data()
+        self.handler.save_to_db()
+        blocks = list(self.handler.iter_ideal_blocks(block_size=2, source='db'))
+
+        self.assertEqual([list(block.columns) for block in blocks], [['x', 'y1', 'y2'], ['x', 'y3']])
+
+    def test_save_to_db_bulk(self):
+        """
+        Test that the bulk save writes typed tables with an index on x.
+        """
+        self.handler.load_data()
+        stats = self.handler.save_to_db(chunksize=2)
+
+        self.assertEqual(stats['ideal']['rows'], 3)
+        self.assertGreater(stats['ideal']['rows_per_second'], 0)
+        with self.handler.engine.connect() as connection:
+            columns = connection.exec_driver_sql('PRAGMA table_info(ideal)').fetchall()
+            indexes = connection.exec_driver_sql('PRAGMA index_list(ideal)').fetchall()
+            journal_mode = connection.exec_driver_sql('PRAGMA journal_mode').scalar()
+        self.assertEqual({column[2] for column in columns}, {'REAL'})
+        self.assertEqual([index[1] for index in indexes], ['idx_ideal_x'])
+        self.assertEqual(journal_mode, 'wal')
+        pd.testing.assert_frame_equal(pd.read_sql('ideal', self.handler.engine),
+                                      self.handler.get_ideal_data().astype(float))
+
+    def test_save_to_db_replaces_tables(self):
+        """
+        Test that saving twice replaces the tables instead of appending.
+        """
+        self.handler.load_data()
+        self.handler.save_to_db()
+        self.handler.save_to_db()
+
+        self.assertEqual(len(pd.read_sql('test', self.handler.engine)), 3)
+
+    def test_load_from_db(self):
+        """
+        Test loading all tables back from the database as float64 frames.
+        """
+        self.handler.load_data()
+        self.handler.save_to_db()
+        handler = DataHandler(self.train_path, self.ideal_path, self.test_path, self.db_path)
+        handler.load_from_db()
+
+        pd.testing.assert_frame_equal(handler.get_ideal_data(), self.handler.get_ideal_data().astype('float64'))
+        self.assertEqual(len(handler.get_test_data()), 3)
+        handler.engine.dispose()
+
+    def test_read_table_columns_and_x_range(self):
+        """
+        Test reading selected columns within an x range.
+        """
+        self.handler.load_data()
+        self.handler.save_to_db()
+        ideal_df = self.handler.read_table('ideal', ['y3'], x_range=(2, None))
+
+        self.assertEqual(list(ideal_df.columns), ['x', 'y3'])
+        self.assertEqual(ideal_df.values.tolist(), [[2.0, 1.0], [3.0, 2.0]])
+        self.assertTrue((ideal_df.dtypes == 'float64').all())
+
+    def test_read_table_missing(self):
+        """
+        Test handling of missing tables and columns.
+        """
+        self.handler.load_data()
+        self.handler.save_to_db()
+        with self.assertRaises(KeyError):
+            self.handler.read_table('ideal', ['y9'])
+        with self.assertRaises(KeyError):
+            self.handler.read_table('missing')
+
+    def test_iter_test_chunks(self):
+        """
+        Test reading the test data in chunks of rows.
+        """
+        chunks = list(self.handler.iter_test_chunks(chunksize=2))
+
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 1])
+
+    def test_iter_ideal_blocks_unknown_source(self):
+        """
+        Test handling of an unknown block source.
+        """
+        with self.assertRaises(ValueError):
+            list(self.handler.iter_ideal_blocks(source='parquet'))
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+import numpy as np
+from src.decimation import lttb, minmax_decimate
+
+class TestDecimation(unittest.TestCase):
+    def setUp(self):
+        """
+        Set up a long noisy series with one spike.
+        """
+        rng = np.random.default_rng(4)
+        self.x = np.arange(10000, dtype=float)
+        self.y = np.sin(self.x / 500) + rng.normal(0, 0.01, size=10000)
+        self.y[4321] = 25.0
+
+    def test_minmax_decimate(self):
+        """
+        Test that min/max decimation bounds the size and keeps the extremes.
+        """
+        x, y = minmax_decimate(self.x, self.y, 200)
+
+        self.assertLessEqual(len(x), 200)
+        self.assertIn(25.0, y)
+        self.assertEqual(y.min(), self.y.min())
+        self.assertTrue((np.diff(x) > 0).all())
+
+    def test_lttb(self):
+        """
+        Test that LTTB keeps the end points and the spike.
+        """
+        x, y = lttb(self.x, self.y, 200)
+
+        self.assertEqual(len(x), 200)
+        self.assertEqual((x[0], x[-1]), (0, 9999))
+        self.assertIn(25.0, y)
+        self.assertTrue((np.diff(x) > 0).all())
+
+    def test_short_series_unchanged(self):
+        """
+        Test that series within the limit are returned as they are.
+        """
+        x, y = lttb(self.x[:10], self.y[:10], 50)
+        np.testing.assert_array_equal(y, self.y[:10])
+        x, y = minmax_decimate(self.x[:10], self.y[:10], 50)
+        np.testing.assert_array_equal(y, self.y[:10])
+
+if __name__ == '__main__':
+    unittest.main()
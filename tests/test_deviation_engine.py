@@ -0,0 +1,49 @@
+import unittest
+import numpy as np
+from src.deviation_engine import DeviationEngine
+
+class TestDeviationEngine(unittest.TestCase):
+    def setUp(self):
+        """
+        Set up the test environment.
+        """
+        rng = np.random.default_rng(0)
+        self.train_matrix = rng.normal(size=(50, 4))
+        self.ideal_matrix = rng.normal(size=(50, 7))
+
+    def naive_deviations(self, train_matrix, ideal_matrix):
+        return np.array([
+            [((train_matrix[:, i] - ideal_matrix[:, j]) ** 2).sum() for j in range(ideal_matrix.shape[1])]
+            for i in range(train_matrix.shape[1])
+        ])
+
+    def test_sum_squared_deviations(self):
+        """
+        Test that the batched deviations match a direct computation.
+        """
+        deviations = DeviationEngine(self.ideal_matrix).sum_squared_deviations(self.train_matrix)
+        expected = self.naive_deviations(self.train_matrix, self.ideal_matrix)
+
+        self.assertEqual(deviations.shape, (4, 7))
+        np.testing.assert_allclose(deviations, expected, rtol=1e-10)
+
+    def test_large_magnitudes(self):
+        """
+        Test that near-identical columns with large magnitudes keep their precision.
+        """
+        ideal_matrix = 1e9 + self.ideal_matrix
+        train_matrix = ideal_matrix[:, :4] + 1e-3
+        deviations = DeviationEngine(ideal_matrix).sum_squared_deviations(train_matrix)
+
+        np.testing.assert_allclose(np.diag(deviations), np.full(4, 50 * 1e-6), rtol=1e-4)
+        self.assertTrue((deviations >= 0).all())
+
+    def test_row_mismatch(self):
+        """
+        Test handling of train and ideal matrices with different row counts.
+        """
+        with self.assertRaises(ValueError):
+            DeviationEngine(self.ideal_matrix).sum_squared_deviations(self.train_matrix[:10])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,8 @@
 import unittest
+import numpy as np
 import pandas as pd
-from src.function_selector import FunctionSelector
+from src.deviation_metrics import DeviationMetric
+from src.function_selector import FunctionSelector, StreamingFunctionSelector
 
 class TestFunctionSelector(unittest.TestCase):
     def setUp(self):
@@ -15,6 +17,14 @@ class TestFunctionSelector(unittest.TestCase):
         self.assertFalse(deviation_df.empty)
         self.assertEqual(len(deviation_df), 6) 
 
+    def test_calculate_deviations_values(self):
+        self.selector.calculate_deviations()
+        deviation_df = self.selector.deviation_df.set_index(['Train Function', 'Ideal Function'])['Deviation']
+
+        self.assertAlmostEqual(deviation_df[('y1', 'y1')], 0)
+        self.assertAlmostEqual(deviation_df[('y1', 'y2')], 14)
+        self.assertAlmostEqual(deviation_df[('y2', 'y3')], 3)
+
     def test_select_ideal_functions(self):
         self.selector.calculate_deviations()
         best_ideal_functions = self.selector.select_ideal_functions()
@@ -22,6 +32,14 @@ class TestFunctionSelector(unittest.TestCase):
         self.assertFalse(best_ideal_functions.empty)
         self.assertEqual(len(best_ideal_functions), 2)  
 
+    def test_select_ideal_functions_max_deviation(self):
+        self.selector.train_df = pd.DataFrame({'x': [1, 2, 3], 'y1': [2, 5, 6], 'y2': [1, 2, 1]})
+        self.selector.calculate_deviations()
+        best_ideal_functions = self.selector.select_ideal_functions().set_index('Train Function')
+
+        self.assertEqual(best_ideal_functions.loc['y1', 'Max Deviation'], 1)
+        self.assertEqual(best_ideal_functions.loc['y2', 'Max Deviation'], 1)
+
     def test_calculate_deviations_key_error(self):
         self.selector.train_df = pd.DataFrame({'a': [1, 2, 3], 'b': [2, 4, 6]})
         with self.assertRaises(KeyError):
@@ -33,5 +51,90 @@ class TestFunctionSelector(unittest.TestCase):
         with self.assertRaises(KeyError):
             self.selector.select_ideal_functions()
 
+    def test_select_top_k(self):
+        top_k = self.selector.select_top_k(k=2).set_index(['Train Function', 'Rank'])
+
+        self.assertEqual(top_k.loc[('y1', 1), 'Ideal Function'], 'y1')
+        self.assertEqual(top_k.loc[('y2', 1), 'Ideal Function'], 'y2')
+        self.assertEqual(top_k.loc[('y2', 2), 'Ideal Function'], 'y3')
+        self.assertEqual(top_k.loc[('y2', 2), 'Deviation'], 3)
+
+    def test_select_top_k_metrics(self):
+        rng = np.random.default_rng(2)
+        x = np.arange(50)
+        ideal_data = pd.DataFrame(rng.normal(size=(50, 40)), columns=[f'i{i}' for i in range(40)])
+        ideal_data.insert(0, 'x', x)
+        train_data = pd.DataFrame({'x': x, 't1': ideal_data['i7'] + 0.1, 't2': ideal_data['i31'] - 0.2})
+        selector = FunctionSelector(train_data, ideal_data)
+        diffs = train_data[['t1', 't2']].to_numpy()[:, :, None] - ideal_data.iloc[:, 1:].to_numpy()[:, None, :]
+        expected = {'sse': (diffs ** 2).sum(axis=0), 'max_abs': np.abs(diffs).max(axis=0),
+                    'mae': np.abs(diffs).mean(axis=0)}
+
+        for metric, values in expected.items():
+            top_k = selector.select_top_k(k=3, metric=metric, row_block=8, column_block=16)
+            for train_pos, train_col in enumerate(['t1', 't2']):
+                candidates = top_k[top_k['Train Function'] == train_col]
+                best = np.argsort(values[train_pos], kind='stable')[:3]
+                self.assertEqual(list(candidates['Ideal Function']), [f'i{i}' for i in best])
+                np.testing.assert_allclose(candidates['Deviation'], values[train_pos][best])
+        self.assertGreater(selector.pruning_stats['skipped_fraction'], 0)
+
+    def test_select_top_k_prunes_within_one_block(self):
+        rng = np.random.default_rng(4)
+        x = np.arange(200)
+        ideal_data = pd.DataFrame(rng.normal(size=(200, 100)), columns=[f'i{i}' for i in range(100)])
+        ideal_data.insert(0, 'x', x)
+        train_data = pd.DataFrame({'x': x, 't1': ideal_data['i0'] + 0.1})
+        selector = FunctionSelector(train_data, ideal_data)
+        top_k = selector.select_top_k(k=1)
+
+        # All 100 columns fit in the default column_block, the runner-ups are still pruned early
+        self.assertEqual(list(top_k['Ideal Function']), ['i0'])
+        self.assertGreater(selector.pruning_stats['skipped_fraction'], 0.5)
+
+    def test_select_top_k_unknown_metric(self):
+        with self.assertRaises(ValueError):
+            self.selector.select_top_k(metric='rmse')
+
+    def test_incomplete_metric(self):
+        class NoAccumulate(DeviationMetric):
+            name = 'incomplete'
+
+        with self.assertRaises(TypeError):
+            NoAccumulate()
+
+class TestStreamingFunctionSelector(unittest.TestCase):
+    def setUp(self):
+        self.train_data = pd.DataFrame({'x': [1, 2, 3], 'y1': [2, 4, 6], 'y2': [1, 2, 3]})
+        self.ideal_data = pd.DataFrame({'x': [1, 2, 3], 'y1': [2, 4, 6], 'y2': [1, 2, 3], 'y3': [0, 1, 2]})
+        self.ideal_blocks = [self.ideal_data[['x', 'y1', 'y2']], self.ideal_data[['x', 'y3']]]
+
+    def test_select_ideal_functions(self):
+        selector = StreamingFunctionSelector(self.train_data, iter(self.ideal_blocks))
+        selector.calculate_deviations()
+        best_ideal_functions = selector.select_ideal_functions().set_index('Train Function')
+
+        self.assertEqual(best_ideal_functions.loc['y1', 'Ideal Function'], 'y1')
+        self.assertEqual(best_ideal_functions.loc['y2', 'Ideal Function'], 'y2')
+
+    def test_top_k(self):
+        selector = StreamingFunctionSelector(self.train_data, iter(self.ideal_blocks), top_k=2)
+        selector.calculate_deviations()
+
+        self.assertEqual(len(selector.deviation_df), 4)
+        self.assertEqual(selector.top_candidates['y2'], [('y2', 0.0, 0.0), ('y3', 3.0, 1.0)])
+
+    def test_matches_full_selection(self):
+        full = FunctionSelector(self.train_data, self.ideal_data)
+        full.calculate_deviations()
+        streaming = StreamingFunctionSelector(self.train_data, iter(self.ideal_blocks), top_k=3)
+        streaming.calculate_deviations()
+
+        # The full deviations store the names as categoricals, the small top-k output as strings
+        expected = full.deviation_df.astype({'Train Function': str, 'Ideal Function': str})
+        expected = expected.sort_values(['Train Function', 'Deviation']).reset_index(drop=True)
+        actual = streaming.deviation_df.drop(columns='Max Deviation').sort_values(['Train Function', 'Deviation']).reset_index(drop=True)
+        pd.testing.assert_frame_equal(actual, expected)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+from src.function_selector import FunctionSelector
+from src.incremental import IncrementalDeviationTracker
+
+class TestIncrementalDeviationTracker(unittest.TestCase):
+    """
+    Unit tests for the IncrementalDeviationTracker class.
+    """
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        x = np.linspace(-5, 5, 60)
+        self.ideal_df = pd.DataFrame({'x': x, **{f'y{i}': rng.normal(size=len(x)) for i in range(1, 21)}})
+        self.train_df = pd.DataFrame({'x': x, **{f'y{i}': self.ideal_df[f'y{2 * i}'] + rng.normal(0, 0.2, len(x))
+                                                  for i in range(1, 5)}})
+
+    def exact_selection(self, train_df):
+        selector = FunctionSelector(train_df.reset_index(drop=True), self.ideal_df)
+        selector.calculate_deviations()
+        return selector.select_ideal_functions().reset_index(drop=True)
+
+    def assert_same_selection(self, incremental, exact):
+        self.assertEqual(list(incremental['Train Function']), list(exact['Train Function']))
+        self.assertEqual(list(incremental['Ideal Function']), list(exact['Ideal Function']))
+        np.testing.assert_allclose(incremental['Deviation'], exact['Deviation'], rtol=1e-9)
+        np.testing.assert_allclose(incremental['Max Deviation'], exact['Max Deviation'], rtol=1e-9)
+
+    def test_updates_match_full_recomputation(self):
+        """
+        Test that batches of rows give the selection of a full recomputation, in any order.
+        """
+        tracker = IncrementalDeviationTracker(self.ideal_df)
+        shuffled = self.train_df.sample(frac=1, random_state=0)
+        for start in range(0, len(shuffled), 15):
+            best = tracker.update(shuffled.iloc[start:start + 15])
+
+        self.assertEqual(tracker.n_rows, len(self.train_df))
+        self.assert_same_selection(best, self.exact_selection(self.train_df))
+        self.assertEqual(tracker.stats['updates'], 4)
+        self.assertGreater(tracker.stats['kept'], 0)
+
+    def test_ranking_change(self):
+        """
+        Test that the selection follows new rows that overturn the ranking.
+        """
+        x = self.ideal_df['x']
+        tracker = IncrementalDeviationTracker(self.ideal_df)
+        first = pd.DataFrame({'x': x[:30], 'y1': self.ideal_df['y1'][:30]})
+        self.assertEqual(list(tracker.update(first)['Ideal Function']), ['y1'])
+        second = pd.DataFrame({'x': x[30:], 'y1': self.ideal_df['y3'][30:] * 10})
+        full = pd.concat([first, second])
+
+        self.assert_same_selection(tracker.update(second), self.exact_selection(full))
+        with self.assertRaises(ValueError):
+            tracker.update(pd.DataFrame({'x': [100.0], 'y1': [0.0]}))
+        with self.assertRaises(KeyError):
+            tracker.update(pd.DataFrame({'x': [0.0], 'y9': [0.0]}))
+
+    def test_save_and_load(self):
+        """
+        Test that persisted accumulators continue where they left off.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            engine = create_engine('sqlite:///' + os.path.join(tmp_dir, 'data.db'))
+            tracker = IncrementalDeviationTracker(self.ideal_df)
+            tracker.update(self.train_df.iloc[:40])
+            tracker.save(engine)
+
+            restored = IncrementalDeviationTracker.load(engine, self.ideal_df)
+            best = restored.update(self.train_df.iloc[40:])
+            with self.assertRaises(KeyError):
+                IncrementalDeviationTracker.load(engine, self.ideal_df.drop(columns='y20'))
+            with self.assertRaises(ValueError):
+                IncrementalDeviationTracker.load(engine, self.ideal_df.assign(y1=self.ideal_df['y1'] + 1))
+            with self.assertRaises(ValueError):
+                IncrementalDeviationTracker.load(engine, self.ideal_df.assign(x=self.ideal_df['x'] * 2))
+            engine.dispose()
+
+        self.assertEqual(restored.n_rows, len(self.train_df))
+        self.assert_same_selection(best, self.exact_selection(self.train_df))
+
+if __name__ == '__main__':
+    unittest.main()
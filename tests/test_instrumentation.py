@@ -0,0 +1,80 @@
+import unittest
+import json
+from unittest import mock
+import os
+import tempfile
+import pandas as pd
+from src.instrumentation import StageProfiler
+from src.main import Main
+
+class TestStageProfiler(unittest.TestCase):
+    def test_stage(self):
+        """
+        Test that a stage records its timings and details and is passed to the hooks.
+        """
+        received = []
+        profiler = StageProfiler(hooks=[received.append])
+        with profiler.stage('select', pairs=6) as record:
+            record['rows'] = 3
+
+        self.assertEqual(received, profiler.records)
+        self.assertEqual(received[0]['stage'], 'select')
+        self.assertEqual(received[0]['rows'], 3)
+        self.assertEqual(received[0]['pairs'], 6)
+        self.assertGreaterEqual(received[0]['wall_seconds'], 0)
+        self.assertGreaterEqual(received[0]['cpu_seconds'], 0)
+        if received[0]['process_peak_rss_bytes'] is not None:
+            self.assertGreaterEqual(received[0]['peak_rss_delta_bytes'], 0)
+
+    def test_stage_records_failures(self):
+        """
+        Test that a failing stage is still recorded.
+        """
+        profiler = StageProfiler()
+        with self.assertRaises(ValueError):
+            with profiler.stage('map'):
+                raise ValueError("mapping failed")
+
+        self.assertEqual([record['stage'] for record in profiler.records], ['map'])
+
+    def test_write_report(self):
+        """
+        Test writing the report as JSON.
+        """
+        profiler = StageProfiler()
+        with profiler.stage('load'):
+            pass
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'profile.json')
+            profiler.write_report(path)
+            with open(path) as f:
+                report = json.load(f)
+
+        self.assertEqual([stage['stage'] for stage in report['stages']], ['load'])
+        self.assertIn('total_wall_seconds', report)
+
+class TestMainProfiling(unittest.TestCase):
+    def test_run_records_stages(self):
+        """
+        Test that a pipeline run records every stage with its rows and bytes.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            paths = [os.path.join(tmp_dir, name) for name in ('train.csv', 'ideal.csv', 'test.csv')]
+            pd.DataFrame({'x': [1, 2, 3], 'y1': [2, 4, 6]}).to_csv(paths[0], index=False)
+            pd.DataFrame({'x': [1, 2, 3], 'y1': [2, 4, 6], 'y2': [1, 2, 3]}).to_csv(paths[1], index=False)
+            pd.DataFrame({'x': [1, 2], 'y': [2, 4]}).to_csv(paths[2], index=False)
+            main = Main(*paths, db_path='sqlite:///' + os.path.join(tmp_dir, 'data.db'))
+            with mock.patch('src.visualizer.show') as show:
+                main.run()
+            main.data_handler.engine.dispose()
+
+        records = {record['stage']: record for record in main.profiler.records}
+        self.assertEqual(list(records), ['load', 'save', 'select', 'map', 'visualize'])
+        self.assertEqual(records['load']['rows'], 8)
+        self.assertGreater(records['load']['bytes_read'], 0)
+        self.assertGreater(records['save']['bytes_written'], 0)
+        self.assertEqual(records['map']['matched'], 2)
+        show.assert_called_once()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+import json
+import os
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+import pandas as pd
+from src.data_handler import DataHandler
+from src.mapping_service import MappingModel, MappingServer
+
+class TestMappingService(unittest.TestCase):
+    def setUp(self):
+        """
+        Set up CSV files and start a mapping server on a free port.
+        """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        paths = [os.path.join(self.tmp_dir.name, name) for name in ('train.csv', 'ideal.csv', 'test.csv')]
+        pd.DataFrame({'x': [1, 2, 3], 'y1': [2, 4, 6], 'y2': [1, 2, 3]}).to_csv(paths[0], index=False)
+        pd.DataFrame({'x': [1, 2, 3], 'y1': [2, 4, 6], 'y2': [1, 2, 3], 'y3': [0, 1, 2]}).to_csv(paths[1], index=False)
+        pd.DataFrame({'x': [1], 'y': [2]}).to_csv(paths[2], index=False)
+        self.ideal_path = paths[1]
+        self.data_handler = DataHandler(*paths, 'sqlite:///' + os.path.join(self.tmp_dir.name, 'data.db'))
+
+        self.model = MappingModel(self.data_handler, source='csv')
+        self.model.load()
+        self.server = MappingServer(('127.0.0.1', 0), self.model)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+
+    def tearDown(self):
+        """
+        Stop the server and clean up.
+        """
+        self.server.shutdown()
+        self.server.server_close()
+        self.data_handler.engine.dispose()
+        self.tmp_dir.cleanup()
+
+    def request(self, path, payload=None):
+        data = None if payload is None else json.dumps(payload).encode('utf-8')
+        with urllib.request.urlopen(self.url + path, data=data) as response:
+            return json.loads(response.read())
+
+    def test_health(self):
+        """
+        Test the health endpoint lists the selected functions.
+        """
+        response = self.request('/health')
+
+        self.assertEqual(response['status'], 'ok')
+        self.assertEqual([func['Ideal Function'] for func in response['functions']], ['y1', 'y2'])
+
+    def test_map_single_point(self):
+        """
+        Test mapping a single point.
+        """
+        result = self.request('/map', {'x': 2, 'y': 4})['result']
+
+        self.assertEqual(result['Ideal Function'], 'y1')
+        self.assertEqual(result['Delta y'], 0)
+
+    def test_map_batch_keeps_input_order(self):
+        """
+        Test that batch results line up with the input points, with None for unmatched points.
+        """
+        results = self.request('/map/batch', {'points': [[1, 1], [2, 100], [3, 6]]})['results']
+
+        self.assertEqual(results[0]['Ideal Function'], 'y2')
+        self.assertIsNone(results[1])
+        self.assertEqual(results[2]['Ideal Function'], 'y1')
+
+    def test_reload(self):
+        """
+        Test that a reload picks up new ideal data.
+        """
+        pd.DataFrame({'x': [1, 2, 3], 'z1': [2, 4, 6], 'z2': [1, 2, 3]}).to_csv(self.ideal_path, index=False)
+        response = self.request('/reload', {})
+
+        self.assertEqual([func['Ideal Function'] for func in response['functions']], ['z1', 'z2'])
+        self.assertEqual(self.request('/map', {'x': 1, 'y': 2})['result']['Ideal Function'], 'z1')
+
+    def test_invalid_request(self):
+        """
+        Test that a malformed request is answered with status 400.
+        """
+        with self.assertRaises(urllib.error.HTTPError) as context:
+            self.request('/map', {'x': 1})
+        self.assertEqual(context.exception.code, 400)
+
+    def test_invalid_batch(self):
+        """
+        Test that batches which are not a list of [x, y] pairs are answered with status 400.
+        """
+        for points in ([1, 2, 3, 4], [[1, 2, 3], [4, 5, 6]], [[1, 2], [3]]):
+            with self.assertRaises(urllib.error.HTTPError) as context:
+                self.request('/map/batch', {'points': points})
+            self.assertEqual(context.exception.code, 400)
+        self.assertEqual(self.request('/map/batch', {'points': []})['results'], [])
+
+    def test_map_points_matches_mapper(self):
+        """
+        Test that the array path of the model gives the records of TestMapper.map_points.
+        """
+        x_values, y_values = [3, 1, 2, 9], [6, 5, 2, 0]
+        results, matched = self.model.mapper.map_points(x_values, y_values, return_positions=True)
+        expected = [None] * len(x_values)
+        for position, record in zip(matched, results.to_dict('records')):
+            expected[position] = record
+
+        self.assertEqual(self.model.map_points(x_values, y_values), expected)
+
+if __name__ == '__main__':
+    unittest.main()
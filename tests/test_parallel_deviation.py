@@ -0,0 +1,71 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+import numpy as np
+import pandas as pd
+from src.deviation_engine import DeviationEngine
+from src.function_selector import FunctionSelector
+from src.parallel_deviation import parallel_sum_squared_deviations, resolve_workers
+
+class TestParallelDeviation(unittest.TestCase):
+    def setUp(self):
+        """
+        Set up the test environment.
+        """
+        rng = np.random.default_rng(1)
+        self.train_matrix = rng.normal(size=(40, 3))
+        self.ideal_matrix = rng.normal(size=(40, 11))
+
+    def test_parallel_sum_squared_deviations(self):
+        """
+        Test that the parallel search matches the single-process engine.
+        """
+        expected = DeviationEngine(self.ideal_matrix).sum_squared_deviations(self.train_matrix)
+        deviations = parallel_sum_squared_deviations(self.train_matrix, self.ideal_matrix, workers=3)
+
+        np.testing.assert_allclose(deviations, expected, rtol=1e-12)
+
+    def test_tasks_receive_only_their_range(self):
+        """
+        Test that no ideal-sized array is sent with the tasks, only the shared buffer name and a range.
+        """
+        submitted = []
+
+        class RecordingExecutor(ThreadPoolExecutor):
+            def submit(self, fn, *args):
+                submitted.append(args)
+                return super().submit(fn, *args)
+
+        with mock.patch('src.parallel_deviation.ProcessPoolExecutor', RecordingExecutor):
+            deviations = parallel_sum_squared_deviations(self.train_matrix, self.ideal_matrix, workers=3)
+
+        expected = DeviationEngine(self.ideal_matrix).sum_squared_deviations(self.train_matrix)
+        np.testing.assert_allclose(deviations, expected, rtol=1e-12)
+        self.assertEqual(len(submitted), 3)
+        for args in submitted:
+            arrays = [arg for arg in args if isinstance(arg, np.ndarray)]
+            self.assertEqual([array.shape for array in arrays], [self.train_matrix.shape])
+
+    def test_selector_tie_break(self):
+        """
+        Test that ties between ideal functions resolve to the first column with several workers.
+        """
+        train_data = pd.DataFrame({'x': [1, 2, 3], 'y1': [2, 4, 6]})
+        ideal_data = pd.DataFrame({'x': [1, 2, 3], 'a': [0, 0, 0], 'b': [2, 4, 6], 'c': [2, 4, 6], 'd': [2, 4, 6]})
+        selector = FunctionSelector(train_data, ideal_data, workers=2)
+        selector.calculate_deviations()
+        best_ideal_functions = selector.select_ideal_functions()
+
+        self.assertEqual(list(best_ideal_functions['Ideal Function']), ['b'])
+
+    def test_resolve_workers(self):
+        """
+        Test resolving the workers setting.
+        """
+        self.assertEqual(resolve_workers(2), 2)
+        self.assertGreaterEqual(resolve_workers(None), 1)
+        with self.assertRaises(ValueError):
+            resolve_workers(0)
+
+if __name__ == '__main__':
+    unittest.main()
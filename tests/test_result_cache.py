@@ -0,0 +1,142 @@
+import unittest
+from unittest import mock
+import os
+import tempfile
+import pandas as pd
+from sqlalchemy import create_engine
+from src.main import Main
+from src.result_cache import ResultCache, file_fingerprint
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        """
+        Set up a temporary database.
+        """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.engine = create_engine('sqlite:///' + os.path.join(self.tmp_dir.name, 'data.db'))
+        self.cache = ResultCache(self.engine)
+        self.key = ResultCache.selection_key('train-hash', 'ideal-hash')
+        self.best_ideal_functions = pd.DataFrame({
+            'Train Function': ['y1'], 'Ideal Function': ['y2'], 'Deviation': [0.5], 'Max Deviation': [0.25]
+        })
+
+    def tearDown(self):
+        """
+        Clean up the temporary database.
+        """
+        self.engine.dispose()
+        self.tmp_dir.cleanup()
+
+    def test_file_fingerprint(self):
+        """
+        Test that the fingerprint follows the file content.
+        """
+        path = os.path.join(self.tmp_dir.name, 'a.csv')
+        with open(path, 'w') as f:
+            f.write("x,y\n1,2\n")
+        first = file_fingerprint(path)
+        with open(path, 'a') as f:
+            f.write("2,3\n")
+
+        self.assertEqual(len(first), 64)
+        self.assertNotEqual(file_fingerprint(path), first)
+
+    def test_input_hashes(self):
+        """
+        Test recording and reading the input hashes.
+        """
+        self.assertEqual(self.cache.stored_input_hashes(), {})
+        self.cache.record_input_hashes({'train': 'a', 'ideal': 'b', 'test': 'c'})
+
+        self.assertEqual(self.cache.stored_input_hashes(), {'train': 'a', 'ideal': 'b', 'test': 'c'})
+
+    def test_selection_round_trip(self):
+        """
+        Test storing and loading a selection, replacing an earlier one under the same key.
+        """
+        self.assertIsNone(self.cache.load_selection(self.key))
+        self.cache.store_selection(self.key, self.best_ideal_functions, self.best_ideal_functions)
+        self.cache.store_selection(self.key, self.best_ideal_functions, self.best_ideal_functions)
+        deviation_df, best_ideal_functions = self.cache.load_selection(self.key)
+
+        pd.testing.assert_frame_equal(best_ideal_functions, self.best_ideal_functions)
+        self.assertEqual(len(deviation_df), 1)
+        self.assertIsNone(self.cache.load_selection(ResultCache.selection_key('other', 'ideal-hash')))
+
+    def test_test_results_only_new_points(self):
+        """
+        Test that only unseen test points are reported for mapping.
+        """
+        test_df = pd.DataFrame({'x': [1.0, 2.0], 'y': [2.0, 9.0]})
+        results, new_points = self.cache.load_test_results(self.key, test_df)
+        self.assertIsNone(results)
+        self.assertEqual(len(new_points), 2)
+
+        mapped = pd.DataFrame({'x': [1.0], 'y': [2.0], 'Delta y': [0.0], 'Ideal Function': ['y1'], 'Train Function': ['y1']})
+        self.cache.store_test_results(self.key, new_points, mapped)
+        test_df = pd.DataFrame({'x': [3.0, 1.0, 2.0], 'y': [6.0, 2.0, 9.0]})
+        results, new_points = self.cache.load_test_results(self.key, test_df)
+
+        self.assertEqual(new_points.values.tolist(), [[3.0, 6.0]])
+        self.assertEqual(list(results['x']), [1.0])
+
+class TestMainCache(unittest.TestCase):
+    def setUp(self):
+        """
+        Set up input CSV files and a database in a temporary directory.
+        """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.paths = [os.path.join(self.tmp_dir.name, name) for name in ('train.csv', 'ideal.csv', 'test.csv')]
+        pd.DataFrame({'x': [1, 2, 3], 'y1': [2, 4, 6], 'y2': [1, 2, 3]}).to_csv(self.paths[0], index=False)
+        pd.DataFrame({'x': [1, 2, 3], 'y1': [2, 4, 6], 'y2': [1, 2, 3], 'y3': [0, 1, 2]}).to_csv(self.paths[1], index=False)
+        pd.DataFrame({'x': [1, 2], 'y': [2, 4]}).to_csv(self.paths[2], index=False)
+        self.db_path = 'sqlite:///' + os.path.join(self.tmp_dir.name, 'data.db')
+        # Keep the runs headless instead of opening the plots in a browser
+        show = mock.patch('src.visualizer.show')
+        show.start()
+        self.addCleanup(show.stop)
+
+    def tearDown(self):
+        """
+        Clean up the temporary directory.
+        """
+        self.tmp_dir.cleanup()
+
+    def test_run_maps_only_new_test_points(self):
+        """
+        Test that a rerun with extra test rows maps only the new rows.
+        """
+        main = Main(*self.paths, cache=True, db_path=self.db_path)
+        main.run()
+        pd.DataFrame({'x': [1, 2, 3], 'y': [2, 4, 6]}).to_csv(self.paths[2], index=False)
+        main.run()
+
+        points = pd.read_sql('cached_test_points', main.data_handler.engine)
+        results = pd.read_sql('cached_test_results', main.data_handler.engine)
+        main.data_handler.engine.dispose()
+        self.assertEqual(list(points['x']), [1, 2, 3])
+        self.assertEqual(list(results['x']), [1, 2, 3])
+
+    def test_run_rewrites_only_changed_inputs(self):
+        """
+        Test that changing only the test data reloads and rewrites only the test table.
+        """
+        Main(*self.paths, cache=True, db_path=self.db_path).run()
+        pd.DataFrame({'x': [1, 2, 3], 'y': [2, 4, 6]}).to_csv(self.paths[2], index=False)
+        main = Main(*self.paths, cache=True, db_path=self.db_path)
+        with mock.patch('src.main.FunctionSelector') as selector:
+            main.run()
+        main.data_handler.engine.dispose()
+
+        records = {record['stage']: record for record in main.profiler.records}
+        self.assertEqual(records['load']['source'], {'train': 'db', 'ideal': 'db', 'test': 'csv'})
+        self.assertEqual(records['save']['tables'], ['test'])
+        selector.assert_not_called()
+
+        unchanged = Main(*self.paths, cache=True, db_path=self.db_path)
+        unchanged.run()
+        unchanged.data_handler.engine.dispose()
+        self.assertNotIn('save', [record['stage'] for record in unchanged.profiler.records])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+import numpy as np
+import pandas as pd
+from src.function_selector import FunctionSelector
+from src.results import ResultBuffer, categorical, category_codes
+from src.test_mapper import TestMapper
+
+class TestResults(unittest.TestCase):
+    """
+    Unit tests for the compact result containers.
+    """
+    def test_categorical(self):
+        """
+        Test that duplicate and unused names are folded into sorted categories.
+        """
+        column = categorical(['y2', 'y10', 'y2', 'y7'], [0, 1, 2, 1])
+        self.assertEqual(list(column), ['y2', 'y10', 'y2', 'y10'])
+        self.assertEqual(list(column.categories), ['y10', 'y2'])
+
+    def test_category_codes(self):
+        """
+        Test that precomputed codes rebuild the names of any positions.
+        """
+        dtype, codes = category_codes(['y2', 'y10', 'y2'])
+        column = pd.Categorical.from_codes(codes[[2, 1, 1]], dtype=dtype)
+        self.assertEqual(list(column), ['y2', 'y10', 'y10'])
+        self.assertEqual(list(dtype.categories), ['y10', 'y2'])
+
+    def test_result_buffer_grows(self):
+        """
+        Test that appends beyond the capacity keep all rows and their dtypes.
+        """
+        buffer = ResultBuffer({'Deviation': np.float64, 'Rank': np.int64},
+                              {'Train Function': ['y1', 'y2'], 'Ideal Function': ['y3', 'y4', 'y5']},
+                              capacity=2)
+        buffer.append(**{'Train Function': 0, 'Ideal Function': [2, 0, 1],
+                         'Deviation': [0.5, 1.5, 2.5], 'Rank': [1, 2, 3]})
+        buffer.append(**{'Train Function': 1, 'Ideal Function': 2, 'Deviation': 3.5, 'Rank': 1})
+        df = buffer.to_frame()
+
+        self.assertEqual(len(buffer), 4)
+        self.assertEqual(list(df.columns), ['Train Function', 'Ideal Function', 'Deviation', 'Rank'])
+        self.assertEqual(list(df['Ideal Function']), ['y5', 'y3', 'y4', 'y5'])
+        self.assertEqual(list(df['Train Function']), ['y1', 'y1', 'y1', 'y2'])
+        self.assertIsInstance(df['Train Function'].dtype, pd.CategoricalDtype)
+        self.assertEqual(df['Rank'].dtype, np.int64)
+        with self.assertRaises(KeyError):
+            buffer.append(Deviation=1.0)
+
+    def test_pipeline_results_are_categorical(self):
+        """
+        Test that the large deviation and mapping results store function names as categoricals,
+        and the small selection outputs as plain strings.
+        """
+        x = np.arange(5, dtype=float)
+        train_df = pd.DataFrame({'x': x, 'y1': x, 'y2': -x})
+        ideal_df = pd.DataFrame({'x': x, 'y1': x + 0.1, 'y2': -x, 'y3': x * 2})
+        selector = FunctionSelector(train_df, ideal_df)
+        selector.calculate_deviations()
+        best = selector.select_ideal_functions()
+        test_df = pd.DataFrame({'x': [1.0, 2.0], 'y': [1.0, -2.0]})
+        results = TestMapper(test_df, ideal_df, train_df, best).map_test_data()
+
+        for df in (selector.deviation_df, results):
+            self.assertIsInstance(df['Ideal Function'].dtype, pd.CategoricalDtype)
+        for df in (best, selector.select_top_k(k=2)):
+            self.assertNotIsInstance(df['Ideal Function'].dtype, pd.CategoricalDtype)
+        self.assertEqual(list(best['Ideal Function']), ['y1', 'y2'])
+        self.assertEqual(list(results['Ideal Function']), ['y1', 'y2'])
+
+if __name__ == '__main__':
+    unittest.main()
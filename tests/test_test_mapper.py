@@ -1,6 +1,10 @@
 import unittest
+import os
+import tempfile
+from sqlalchemy import create_engine
 import pandas as pd
-from src.test_mapper import TestMapper
+import numpy as np
+from src.test_mapper import IdealIndex, TestMapper
 
 class TestTestMapper(unittest.TestCase):
     def setUp(self):
@@ -46,5 +50,122 @@ class TestTestMapper(unittest.TestCase):
         with self.assertRaises(Exception):
             self.mapper.map_test_data()
 
+    def test_map_test_data_off_grid_rejected(self):
+        """
+        Test that test points between grid x values are left unmapped by default.
+        """
+        self.mapper.test_df = pd.DataFrame({'x': [1, 2.5, 3], 'y': [2, 5, 6]})
+        test_results_df = self.mapper.map_test_data()
+
+        self.assertEqual(list(test_results_df['x']), [1, 3])
+
+    def test_map_test_data_off_grid_interpolated(self):
+        """
+        Test that test points between grid x values are mapped with interpolation.
+        """
+        test_data = pd.DataFrame({'x': [2.5], 'y': [5]})
+        mapper = TestMapper(test_data, self.ideal_data, self.train_data, self.best_ideal_functions, x_policy='interpolate')
+        test_results_df = mapper.map_test_data()
+
+        self.assertEqual(len(test_results_df), 1)
+        self.assertAlmostEqual(test_results_df['Delta y'].iloc[0], 0)
+
+    def test_map_test_data_uses_max_deviation(self):
+        """
+        Test that precomputed thresholds from FunctionSelector are used for mapping.
+        """
+        self.mapper.best_ideal_functions = self.best_ideal_functions.assign(**{'Max Deviation': [0.5, 0.5]})
+        self.mapper.test_df = pd.DataFrame({'x': [1, 2], 'y': [2.5, 5]})
+        test_results_df = self.mapper.map_test_data()
+
+        self.assertEqual(list(test_results_df['x']), [1])
+
+    def test_map_test_data_best_match(self):
+        """
+        Test that the 'best' match policy picks the function with the smallest deviation.
+        """
+        self.mapper.best_ideal_functions = self.best_ideal_functions.assign(**{'Max Deviation': [5, 5]})
+        self.mapper.test_df = pd.DataFrame({'x': [1, 2], 'y': [1, 2.5]})
+        first_df = self.mapper.map_test_data()
+        self.mapper.match_policy = 'best'
+        best_df = self.mapper.map_test_data()
+
+        self.assertEqual(list(first_df['Ideal Function']), ['y1', 'y1'])
+        self.assertEqual(list(best_df['Ideal Function']), ['y2', 'y2'])
+        self.assertEqual(list(best_df['Delta y']), [0, 0.5])
+
+    def test_invalid_x_policy(self):
+        """
+        Test handling of an unknown x policy.
+        """
+        with self.assertRaises(ValueError):
+            TestMapper(self.test_data, self.ideal_data, self.train_data, self.best_ideal_functions, x_policy='closest')
+
+    def test_iter_map_chunks(self):
+        """
+        Test that mapping in chunks gives the same results as mapping everything at once.
+        """
+        expected = self.mapper.map_test_data()
+        chunks = [self.test_data.iloc[:2], self.test_data.iloc[2:]]
+        results = list(self.mapper.iter_map_chunks(chunks))
+
+        self.assertEqual([len(result) for result in results], [2, 1])
+        pd.testing.assert_frame_equal(pd.concat(results, ignore_index=True), expected)
+
+    def test_map_chunks_to_db(self):
+        """
+        Test appending chunked mapping results to an SQLite table.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            engine = create_engine('sqlite:///' + os.path.join(tmp_dir, 'data.db'))
+            chunks = [self.test_data.iloc[:2], self.test_data.iloc[2:]]
+            written = self.mapper.map_chunks_to_db(chunks, engine)
+            stored = pd.read_sql('test_results', engine)
+            engine.dispose()
+
+        self.assertEqual(written, 3)
+        self.assertEqual(list(stored['x']), [1, 2, 3])
+        self.assertEqual(list(stored['Ideal Function']), ['y1', 'y1', 'y1'])
+
+    def test_map_no_chunks_to_db(self):
+        """
+        Test that mapping no chunks clears the results of an earlier run.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            engine = create_engine('sqlite:///' + os.path.join(tmp_dir, 'data.db'))
+            self.mapper.map_chunks_to_db([self.test_data], engine)
+            written = self.mapper.map_chunks_to_db([], engine)
+            stored = pd.read_sql('test_results', engine)
+            engine.dispose()
+
+        self.assertEqual(written, 0)
+        self.assertTrue(stored.empty)
+        self.assertEqual(list(stored.columns), ['x', 'y', 'Delta y', 'Ideal Function', 'Train Function'])
+
+class TestIdealIndex(unittest.TestCase):
+    def setUp(self):
+        """
+        Set up an ideal table with an unsorted x grid.
+        """
+        self.ideal_data = pd.DataFrame({'x': [3, 1, 2], 'y1': [6, 2, 4]})
+
+    def test_lookup_reject(self):
+        values, resolved = IdealIndex(self.ideal_data).lookup([1, 2, 2.4, 5], ['y1'])
+
+        self.assertEqual(list(resolved), [True, True, False, False])
+        self.assertEqual(list(values[resolved, 0]), [2, 4])
+
+    def test_lookup_nearest(self):
+        values, resolved = IdealIndex(self.ideal_data, 'nearest').lookup([0, 2.4, 2.6, 5], ['y1'])
+
+        self.assertTrue(resolved.all())
+        self.assertEqual(list(values[:, 0]), [2, 4, 6, 6])
+
+    def test_lookup_interpolate(self):
+        values, resolved = IdealIndex(self.ideal_data, 'interpolate').lookup([1, 1.5, 2.75, 5], ['y1'])
+
+        self.assertEqual(list(resolved), [True, True, True, False])
+        np.testing.assert_allclose(values[:3, 0], [2, 3, 5.5])
+
 if __name__ == '__main__':
     unittest.main()
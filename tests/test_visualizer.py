@@ -1,4 +1,8 @@
+import json
+import os
+import tempfile
 import unittest
+import numpy as np
 import pandas as pd
 from bokeh.plotting import figure
 from src.visualizer import Visualizer
@@ -28,5 +32,73 @@ class TestVisualizer(unittest.TestCase):
         except Exception as e:
             self.fail(f"Visualizer raised an exception: {e}")
 
+    def test_build_plots_large_data(self):
+        """
+        Test that large series are decimated and dense test data is binned.
+        """
+        x = np.linspace(0, 100, 50000)
+        train_data = pd.DataFrame({'x': x, 'y1': np.sin(x)})
+        test_results_data = pd.DataFrame({
+            'x': x[::2], 'y': np.sin(x[::2]), 'Delta y': 0.0, 'Ideal Function': 'y1', 'Train Function': 'y1'
+        })
+        visualizer = Visualizer.for_large_data(train_data, train_data, test_results_data, screen_width=500)
+        plots = visualizer.build_plots()
+
+        self.assertEqual(len(plots), 1)
+        self.assertEqual(plots[0].output_backend, 'webgl')
+        line_sizes = [len(renderer.data_source.data['x']) for renderer in plots[0].renderers
+                      if 'x' in renderer.data_source.data]
+        self.assertTrue(all(size <= 1000 for size in line_sizes))
+        images = [renderer for renderer in plots[0].renderers if 'image' in renderer.data_source.data]
+        self.assertEqual(len(images), 1)
+        self.assertEqual(images[0].data_source.data['image'][0].shape, (200, 200))
+
+    def test_for_data_selects_large_data_settings(self):
+        """
+        Test that the bounded payload settings are chosen automatically above the size limits.
+        """
+        x = np.linspace(0, 100, 3000)
+        train_data = pd.DataFrame({'x': x, 'y1': np.sin(x)})
+
+        large = Visualizer.for_data(train_data, train_data, self.test_results_data)
+        small = Visualizer.for_data(train_data.iloc[:100], train_data.iloc[:100], self.test_results_data)
+
+        self.assertEqual((large.max_line_points, large.output_backend), (2400, 'webgl'))
+        self.assertEqual((small.max_line_points, small.output_backend), (None, 'canvas'))
+
+    def test_export(self):
+        """
+        Test that every format writes one file per ideal function, also with a worker pool.
+        """
+        x = np.linspace(0, 10, 50)
+        train_data = pd.DataFrame({'x': x, 'y1': np.sin(x), 'y2': np.cos(x)})
+        test_results_data = pd.DataFrame({
+            'x': [1.0, 2.0, 3.0], 'y': [0.8, 0.9, -1.0], 'Delta y': 0.0,
+            'Ideal Function': ['y1', 'y1', 'y2'], 'Train Function': ['y1', 'y1', 'y2']
+        })
+        visualizer = Visualizer(train_data, train_data, test_results_data)
+        with tempfile.TemporaryDirectory() as tmp:
+            for fmt, workers in (('html', 1), ('json', 2), ('png', 2)):
+                paths = visualizer.export(os.path.join(tmp, fmt), fmt, workers=workers)
+                self.assertEqual([os.path.basename(path) for path in paths], [f'y1.{fmt}', f'y2.{fmt}'])
+                self.assertTrue(all(os.path.getsize(path) > 0 for path in paths))
+            with open(os.path.join(tmp, 'json', 'y1.json')) as f:
+                self.assertIn('doc', json.load(f))
+            with open(os.path.join(tmp, 'png', 'y2.png'), 'rb') as f:
+                self.assertEqual(f.read(8), b'\x89PNG\r\n\x1a\n')
+
+        with self.assertRaises(ValueError):
+            visualizer.export(tmp, 'svg')
+
+    def test_export_png_keeps_backend(self):
+        """
+        Test that an in-process PNG export does not switch the matplotlib backend.
+        """
+        import matplotlib
+        backend = matplotlib.get_backend()
+        with tempfile.TemporaryDirectory() as tmp:
+            self.visualizer.export(tmp, 'png', workers=1)
+        self.assertEqual(matplotlib.get_backend(), backend)
+
 if __name__ == '__main__':
     unittest.main()